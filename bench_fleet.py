@@ -0,0 +1,200 @@
+"""批量监控模式的规模基准
+
+在本进程中启动本地模拟门户，并定期把会话踢下线（模拟会话过期），
+每个规模（默认 100 / 300 / 1000 个配置）在独立子进程中运行 FleetRunner 固定时长，
+统计子进程的 CPU 时间与常驻内存，结果写入 JSON 文件。
+
+每个配置使用独立账号与独立的回环源地址（127.1.x.y），门户按源地址分别记录会话，
+因此每个配置被踢下线后都要各自登录。每个配置的开销取相邻规模之间的增量（边际开销），
+不把进程的固定开销摊到配置上。
+
+每个规模同时记录是否跟得上：运行期间平均在线比例、每个配置每分钟的检查次数（理想值为 60 / interval）
+以及实际运行时长超出 --duration 的秒数。在线比例低于 MIN_ONLINE_FRACTION 或超时超过一个检查间隔的规模
+视为饱和（登录线程处理不过来），不参与边际开销计算——饱和时大部分登录根本没有执行，CPU 反而偏低。
+
+用法: python bench_fleet.py [--sizes 100 300 1000] [--duration 60] [--interval 30] [--logout-every 60]
+                           [--login-workers 16] [--output bench_fleet.json]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import threading
+import subprocess
+
+from platform_utils import resident_memory_mb
+
+# 平均在线比例低于该值的规模视为饱和
+MIN_ONLINE_FRACTION = 0.9
+
+def bench_account(i):
+    """第 i 个配置的 (用户名, 源地址)"""
+    return f"bench-{i + 1}", f"127.1.{i // 250}.{i % 250 + 1}"
+
+def run_child(size, portal_url, duration, interval, probe_workers, login_workers):
+    from fleet import FleetRunner
+    from metrics import get_metrics
+
+    base_rss = resident_memory_mb()
+    base_cpu = time.process_time()
+    profiles = []
+    for i in range(size):
+        username, source = bench_account(i)
+        profiles.append((username, {
+            "username": username,
+            "password": "bench",
+            "source_address": source,
+            "login_url": portal_url,
+            "test_url": portal_url + "generate_204",
+            "portal_check_url": portal_url + "generate_204",
+            "route_check_address": "127.0.0.1",
+            "probe_method": "http",
+            "http_probe_timeout": 2,
+            "check_interval": interval,
+            "fast_recheck_interval": 1,
+            "stable_checks": 2,
+            "http_login_timeout": 5,
+            "ac_id": "1",
+        }))
+    runner = FleetRunner(profiles, probe_workers, login_workers)
+    setup_rss = resident_memory_mb()
+    # 每秒采样在线配置数；首个检查间隔内各配置尚未完成首次探测，不计入
+    samples = []
+    done = threading.Event()
+
+    def sample_online():
+        while not done.wait(1.0):
+            if time.perf_counter() - start >= interval:
+                samples.append(sum(1 for m in runner.monitors if m.online) / size)
+
+    start = time.perf_counter()
+    sampler = threading.Thread(target=sample_online, daemon=True)
+    sampler.start()
+    asyncio.run(runner.run(duration))
+    wall = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    cpu = time.process_time() - base_cpu
+    rss = resident_memory_mb()
+    phases = get_metrics().to_dict()["phases"]
+    stats = runner.stats()
+    online_fraction = sum(samples) / len(samples) if samples else None
+    overrun = max(0.0, wall - duration)
+    return {
+        "profiles": size,
+        "online_fraction": round(online_fraction, 3) if online_fraction is not None else None,
+        "checks_per_profile_per_minute": round(stats["checks"] / size / (wall / 60), 2),
+        "expected_checks_per_profile_per_minute": round(60 / interval, 2),
+        "overrun_seconds": round(overrun, 2),
+        "kept_up": online_fraction is not None and online_fraction >= MIN_ONLINE_FRACTION and overrun <= interval,
+        "wall_seconds": round(wall, 2),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_ms_per_minute": round(cpu * 1000 / (wall / 60), 3),
+        "rss_mb": round(rss, 1) if rss is not None else None,
+        "rss_growth_mb": round(rss - base_rss, 1) if rss is not None and base_rss is not None else None,
+        "setup_rss_growth_mb": round(setup_rss - base_rss, 1) if setup_rss is not None and base_rss is not None else None,
+        "stats": stats,
+        "probe_seconds": phases.get("probe"),
+        "login_seconds": phases.get("login"),
+        "login_queue_wait_seconds": phases.get("login_queue_wait"),
+    }
+
+def marginal_costs(results):
+    """相邻规模之间每增加一个配置的 CPU 与内存增量，只使用跟得上的规模"""
+    costs = []
+    results = sorted((r for r in results if r["kept_up"]), key=lambda r: r["profiles"])
+    for a, b in zip(results, results[1:]):
+        added = b["profiles"] - a["profiles"]
+        if added <= 0:
+            continue
+        cost = {
+            "from": a["profiles"],
+            "to": b["profiles"],
+            "cpu_ms_per_profile_per_minute": round((b["cpu_ms_per_minute"] - a["cpu_ms_per_minute"]) / added, 3),
+            "rss_kb_per_profile": None,
+        }
+        if a["rss_growth_mb"] is not None and b["rss_growth_mb"] is not None:
+            cost["rss_kb_per_profile"] = round((b["rss_growth_mb"] - a["rss_growth_mb"]) * 1024 / added, 1)
+        costs.append(cost)
+    return costs
+
+def main():
+    parser = argparse.ArgumentParser(description='批量监控模式规模基准')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 300, 1000])
+    parser.add_argument('--duration', type=float, default=60, help='每个规模运行的秒数')
+    parser.add_argument('--interval', type=float, default=30, help='各配置的检查间隔（秒）')
+    parser.add_argument('--logout-every', type=float, default=60, help='模拟门户每隔多少秒踢下线一次')
+    parser.add_argument('--probe-workers', type=int, default=32)
+    parser.add_argument('--login-workers', type=int, default=16)
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--portal', help=argparse.SUPPRESS)
+    parser.add_argument('--output', default='bench_fleet.json')
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_child(args.child, args.portal, args.duration, args.interval,
+                           args.probe_workers, args.login_workers)
+        print(json.dumps(result))
+        return
+
+    from fake_portal import FakePortal
+    accounts = {bench_account(i)[0]: "bench" for i in range(max(args.sizes))}
+    portal = FakePortal("bench", "bench", accounts=accounts).start()
+    stop = threading.Event()
+
+    def expire_sessions():
+        while not stop.wait(args.logout_every):
+            portal.logout()
+
+    threading.Thread(target=expire_sessions, daemon=True).start()
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"运行: {size} 个配置，{args.duration:.0f} 秒")
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", str(size), "--portal", portal.url,
+                   "--duration", str(args.duration), "--interval", str(args.interval),
+                   "--probe-workers", str(args.probe_workers), "--login-workers", str(args.login_workers)]
+            proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore")
+            if proc.returncode != 0:
+                print(proc.stderr[-2000:])
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"  CPU {result['cpu_seconds']} 秒（每分钟 {result['cpu_ms_per_minute']} ms）"
+                  f"  内存 {result['rss_mb']} MB（增长 {result['rss_growth_mb']} MB）"
+                  f"  检查 {result['stats']['checks']} 次，登录 {result['stats']['logins']} 次")
+            print(f"  平均在线 {result['online_fraction']}，每配置每分钟检查 "
+                  f"{result['checks_per_profile_per_minute']} 次（理想 {result['expected_checks_per_profile_per_minute']}），"
+                  f"超时 {result['overrun_seconds']} 秒 -> {'跟得上' if result['kept_up'] else '饱和，不计入边际开销'}")
+    finally:
+        stop.set()
+        portal.stop()
+
+    marginal = marginal_costs(results)
+    saturated = [r["profiles"] for r in results if not r["kept_up"]]
+    if saturated:
+        print(f"饱和的规模（未计入边际开销）: {saturated}")
+    for cost in marginal:
+        print(f"{cost['from']} -> {cost['to']} 个配置: 每增加一个配置约 {cost['rss_kb_per_profile']} KB 内存、"
+              f"每分钟 {cost['cpu_ms_per_profile_per_minute']} ms CPU")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "duration": args.duration,
+            "interval": args.interval,
+            "logout_every": args.logout_every,
+            "probe_workers": args.probe_workers,
+            "login_workers": args.login_workers,
+            "results": results,
+            "marginal": marginal,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+
+if __name__ == "__main__":
+    main()
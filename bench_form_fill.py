@@ -0,0 +1,84 @@
+"""脚本填表与逐元素填表的耗时对比
+
+需要本机安装 Chrome 与 ChromeDriver。在本地模拟门户的登录页上反复执行两种填表方式，
+计时从开始填表到浏览器跳转到登录成功页，分别统计无定位缓存（冷）与有定位缓存（热）时的耗时，结果写入 JSON 文件。
+
+用法: python bench_form_fill.py --chromedriver-path <目录> [--runs 30] [--output bench_form_fill.json]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from fake_portal import FakePortal
+from locator_cache import LocatorCache
+from network_checker import NetworkChecker
+from benchmark import summarize
+
+# 两种方式都计时到浏览器跳转到登录成功页为止：脚本方式在 setTimeout 中异步点击，
+# execute_script 返回时表单尚未提交，只计到返回会低估其耗时
+SUCCESS_PATH = "srun_portal_success"
+
+def wait_for_success(driver, timeout=10.0, poll=0.005):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if SUCCESS_PATH in driver.current_url:
+            return True
+        time.sleep(poll)
+    return False
+
+def run(checker, page, mode, warm_cache, runs, username, password):
+    """返回 (成功样本的耗时列表, 失败次数)"""
+    fill = checker.fill_form_scripted if mode == "scripted" else checker.fill_form_elements
+    samples = []
+    failures = 0
+    for _ in range(runs):
+        checker.driver.get(page)
+        if not warm_cache:
+            checker.locator_cache.invalidate(page)
+        start = time.perf_counter()
+        if fill(page, username, password) and wait_for_success(checker.driver):
+            samples.append(time.perf_counter() - start)
+        else:
+            failures += 1
+    return samples, failures
+
+def main():
+    parser = argparse.ArgumentParser(description='脚本填表与逐元素填表耗时对比')
+    parser.add_argument('--chromedriver-path', required=True, help='chromedriver 所在目录')
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--output', default='bench_form_fill.json')
+    args = parser.parse_args()
+
+    portal = FakePortal("bench", "bench").start()
+    page = portal.url + "srun_portal_pc"
+    checker = NetworkChecker({"chromedriver_path": args.chromedriver_path})
+    checker.locator_cache = LocatorCache(os.path.join(tempfile.mkdtemp(), "locator_cache.json"))
+    if not checker.initialize_driver():
+        raise SystemExit("无法启动 ChromeDriver")
+
+    results = []
+    try:
+        for mode in ("elements", "scripted"):
+            for warm_cache in (False, True):
+                samples, failures = run(checker, page, mode, warm_cache, args.runs, "bench", "bench")
+                stats = summarize(samples)
+                results.append({"mode": mode, "locator_cache": "warm" if warm_cache else "cold",
+                                "fill_to_success_s": stats, "failures": failures})
+                if not samples:
+                    print(f"{mode:9s} 缓存={'热' if warm_cache else '冷'} 全部失败")
+                    continue
+                print(f"{mode:9s} 缓存={'热' if warm_cache else '冷'} p50={stats['p50'] * 1000:.1f} ms "
+                      f"p95={stats['p95'] * 1000:.1f} ms 失败={failures}")
+    finally:
+        checker.stop_checking()
+        portal.stop()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "runs": args.runs, "results": results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+
+if __name__ == "__main__":
+    main()
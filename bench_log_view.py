@@ -0,0 +1,201 @@
+"""日志界面渲染基准（无需显示器）
+
+在 QT_QPA_PLATFORM=offscreen 下创建日志列表视图，由后台线程以最快速度经 Qt 信号发送记录，
+统计界面线程持续处理的记录数/秒，以及写入指定条数（默认 10 万条）后的常驻内存。
+每种方式在独立子进程中运行，互不影响内存统计：
+- per_record: 每条记录单独插入并滚动到底部，且不限制行数（原先的做法）
+- batched:    LogBatcher 定时批量插入，显示行数受 log_max_lines 限制
+
+逐条插入方式很慢，每种方式最多运行 --time-limit 秒，超时则按已处理的记录数计算速率。
+
+另外在同样的视图上检查向前翻页（paging）：滚动到顶部加载更早的一页后，
+原先位于顶端的行应仍在顶端，否则以非零状态退出。
+
+用法: python bench_log_view.py [--records 100000] [--max-lines 5000] [--time-limit 60] [--output bench_log_view.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from platform_utils import resident_memory_mb
+
+MODES = ("per_record", "batched")
+
+PAGING_LINES = 20000
+
+def check_paging(lines=PAGING_LINES):
+    """向前翻页后原先的顶端行应保持在视图顶端，返回检查结果"""
+    import tempfile
+    from PyQt5.QtCore import QPoint
+    from PyQt5.QtWidgets import QApplication, QListView
+    from log_view import LogFileModel, load_older_in_view
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    fd, path = tempfile.mkstemp(suffix=".log")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for i in range(lines):
+                f.write(f"[2024-01-01 00:00:00] INFO: line {i}\n")
+        model = LogFileModel(path)
+        view = QListView()
+        view.setModel(model)
+        view.setUniformItemSizes(True)
+        view.resize(800, 600)
+        view.show()
+        model.load()
+        deadline = time.monotonic() + 10
+        while not model.can_load_older() and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        view.scrollToTop()
+        app.processEvents()
+        top_text = model.data(view.indexAt(QPoint(0, 0)))
+        start = time.perf_counter()
+        added = load_older_in_view(view, model)
+        elapsed = time.perf_counter() - start
+        app.processEvents()
+        top = view.indexAt(QPoint(0, 0))
+        scrollbar = view.verticalScrollBar()
+        return {
+            "mode": "paging",
+            "rows_added": added,
+            "seconds": round(elapsed, 4),
+            "top_row": top.row(),
+            "kept_position": bool(added) and top.row() == added and model.data(top) == top_text,
+            "can_scroll_up": scrollbar.value() > scrollbar.minimum(),
+        }
+    finally:
+        os.remove(path)
+
+def run_mode(mode, records, max_lines, interval_ms, time_limit):
+    from PyQt5.QtCore import QThread, QObject, pyqtSignal
+    from PyQt5.QtWidgets import QApplication, QListView
+    from log_view import LogFileModel, LogBatcher
+
+    app = QApplication(sys.argv[:1])
+    model = LogFileModel("", max_rows=max_lines if mode == "batched" else 0)
+    view = QListView()
+    view.setModel(model)
+    view.setUniformItemSizes(True)
+    view.resize(800, 600)
+    view.show()
+    app.processEvents()
+    baseline = resident_memory_mb()
+
+    class Producer(QThread):
+        record = pyqtSignal(str, str)
+
+        def run(self):
+            for i in range(records):
+                if self.isInterruptionRequested():
+                    break
+                self.record.emit(f"[2024-01-01 00:00:00] INFO: 第 {i} 条日志记录，用于测量界面渲染吞吐", "INFO")
+
+    class Consumer(QObject):
+        def __init__(self):
+            super().__init__()
+            self.received = 0
+            self.done_at = None
+            if mode == "batched":
+                self.batcher = LogBatcher(model, interval_ms, self)
+                self.batcher.flushed.connect(self.on_flushed)
+
+        def on_record(self, text, level):
+            if self.done_at is not None:
+                return
+            if time.perf_counter() > deadline:
+                # 排队的信号事件优先于定时器处理，超时只能在这里判断
+                self.done_at = time.perf_counter()
+                app.quit()
+                return
+            if mode == "batched":
+                self.batcher.add(text, level)
+                return
+            model.append_line(text, level)
+            view.scrollToBottom()
+            self.on_flushed(1)
+
+        def on_flushed(self, count):
+            view.scrollToBottom()
+            self.received += count
+            if self.received >= records and self.done_at is None:
+                self.done_at = time.perf_counter()
+                app.quit()
+
+    consumer = Consumer()
+    producer = Producer()
+    producer.record.connect(consumer.on_record)
+    start = time.perf_counter()
+    deadline = start + time_limit
+    producer.start()
+    app.exec_()
+    elapsed = consumer.done_at - start
+    producer.requestInterruption()
+    producer.wait()
+    rss = resident_memory_mb()
+    return {
+        "mode": mode,
+        "records": consumer.received,
+        "completed": consumer.received >= records,
+        "displayed_rows": model.rowCount(),
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(consumer.received / elapsed, 1) if elapsed else None,
+        "rss_mb": round(rss, 1) if rss is not None else None,
+        "rss_growth_mb": round(rss - baseline, 1) if rss is not None and baseline is not None else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='日志界面渲染基准')
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--max-lines', type=int, default=5000)
+    parser.add_argument('--interval', type=int, default=100, help='批量刷新间隔（毫秒）')
+    parser.add_argument('--time-limit', type=float, default=60, help='每种方式最长运行秒数')
+    parser.add_argument('--mode', choices=MODES + ("paging",), help=argparse.SUPPRESS)
+    parser.add_argument('--output', default='bench_log_view.json')
+    args = parser.parse_args()
+
+    if args.mode == "paging":
+        print(json.dumps(check_paging()))
+        return
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.records, args.max_lines, args.interval, args.time_limit)))
+        return
+
+    results = []
+    for mode in MODES:
+        cmd = [sys.executable, os.path.abspath(__file__), "--mode", mode, "--records", str(args.records),
+               "--max-lines", str(args.max_lines), "--interval", str(args.interval),
+               "--time-limit", str(args.time_limit)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr)
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        note = "" if result['completed'] else f"（超时，仅处理 {result['records']} 条）"
+        print(f"{mode:12s} {result['records_per_second']:>10} 条/秒{note}  显示 {result['displayed_rows']} 行  "
+              f"常驻内存 {result['rss_mb']} MB（增长 {result['rss_growth_mb']} MB）")
+
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", "paging"],
+                          capture_output=True, text=True)
+    paging = json.loads(proc.stdout.strip().splitlines()[-1]) if proc.returncode == 0 else None
+    if paging:
+        results.append(paging)
+        print(f"{'paging':12s} 加载 {paging['rows_added']} 行耗时 {paging['seconds']} 秒  顶端行 {paging['top_row']}  "
+              f"位置{'保持' if paging['kept_position'] else '跳动'}")
+    else:
+        print(proc.stderr)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "results": results},
+                  f, indent=2, ensure_ascii=False)
+    if not paging or not paging["kept_position"] or not paging["can_scroll_up"]:
+        raise SystemExit("向前翻页后视图位置未保持")
+
+if __name__ == "__main__":
+    main()
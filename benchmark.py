@@ -0,0 +1,237 @@
+"""断网检测与恢复时间基准测试
+
+在本地模拟门户上运行 NetworkChecker.start_checking，按脚本制造断网，
+统计每种登录方式 / 调度设置下的检测延迟、登录耗时与总断网时长（p50/p95/p99），
+结果写入 JSON 文件，便于对比回归。
+
+用法: python benchmark.py [--engines http selenium] [--outages 10] [--output bench_results.json]
+"""
+import os
+import json
+import time
+import socket
+import random
+import argparse
+import platform
+import threading
+
+from fake_portal import FakePortal
+from network_checker import NetworkChecker
+from dns_cache import get_resolver
+from history import HISTORY_DB
+
+# 调度设置（时间按比例缩小，避免一次基准跑几个小时）
+SCHEDULES = {
+    "fixed": {"check_interval": 10, "fast_recheck_interval": 10, "stable_checks": 0},
+    "adaptive": {"check_interval": 10, "fast_recheck_interval": 1, "stable_checks": 2},
+}
+
+# 断网场景：session_expired 由门户踢下线、需登录恢复；link_flap 为链路中断一段时间后自行恢复；
+# dns_outage 在踢下线的同时让门户域名解析失败一段时间，恢复后需登录
+SCENARIOS = ("session_expired", "link_flap", "dns_outage")
+
+# dns_outage 场景下门户使用的域名，解析到本机；只在该场景运行期间替换 socket.getaddrinfo
+PORTAL_HOST = "portal.bench.test"
+_dns_down = threading.Event()
+
+def _patch_getaddrinfo():
+    """让 PORTAL_HOST 解析到本机、_dns_down 置位时解析失败，返回原函数供恢复"""
+    original = socket.getaddrinfo
+
+    def bench_getaddrinfo(host, *args, **kwargs):
+        if host == PORTAL_HOST:
+            if _dns_down.is_set():
+                raise socket.gaierror(socket.EAI_NONAME, f"{host} 解析失败（模拟）")
+            host = "127.0.0.1"
+        return original(host, *args, **kwargs)
+
+    socket.getaddrinfo = bench_getaddrinfo
+    return original
+
+def history_fingerprint():
+    """历史数据库及其 WAL 文件的 (大小, 修改时间)，用于确认基准没有写入真实历史"""
+    state = []
+    for path in (HISTORY_DB, HISTORY_DB + "-wal"):
+        try:
+            st = os.stat(path)
+            state.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            state.append(None)
+    return state
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+class InstrumentedChecker:
+    """包装 NetworkChecker，记录每次探测与登录的时间点"""
+
+    def __init__(self, config):
+        self.checker = NetworkChecker(config)
+        self.events = []
+        self._lock = threading.Lock()
+        self._check_network = self.checker.check_network
+        self._login = self.checker.login
+        self.checker.check_network = self._wrapped_check
+        self.checker.login = self._wrapped_login
+
+    def _record(self, kind, **data):
+        with self._lock:
+            self.events.append(dict(kind=kind, t=time.monotonic(), **data))
+
+    def _wrapped_check(self):
+        ok = self._check_network()
+        self._record("probe", ok=ok)
+        return ok
+
+    def _wrapped_login(self):
+        start = time.monotonic()
+        self._record("login_start")
+        result = self._login()
+        self._record("login_end", ok=bool(result), duration=time.monotonic() - start)
+        return result
+
+    def events_since(self, t0):
+        with self._lock:
+            return [e for e in self.events if e["t"] >= t0]
+
+def run_outage(portal, inst, scenario, link_down_for, deadline):
+    """制造一次断网，返回 (检测延迟, 登录耗时, 断网时长)，超时返回 None"""
+    t_drop = time.monotonic()
+    portal.logout()
+    if scenario == "link_flap":
+        portal.link_down = True
+        threading.Timer(link_down_for, lambda: setattr(portal, "link_down", False)).start()
+    elif scenario == "dns_outage":
+        _dns_down.set()
+        threading.Timer(link_down_for, _dns_down.clear).start()
+    while time.monotonic() - t_drop < deadline:
+        time.sleep(0.05)
+        events = inst.events_since(t_drop)
+        failed = [e for e in events if e["kind"] == "probe" and e["ok"] is False]
+        restored = [e for e in events if e["kind"] == "probe" and e["ok"]]
+        if failed and restored and restored[-1]["t"] > failed[0]["t"]:
+            logins = [e for e in events if e["kind"] == "login_end" and e["t"] <= restored[-1]["t"]]
+            login_time = logins[-1]["duration"] if logins else None
+            return failed[0]["t"] - t_drop, login_time, restored[-1]["t"] - t_drop
+    portal.link_down = False
+    _dns_down.clear()
+    return None
+
+def run_case(engine, schedule_name, scenario, outages, username, password):
+    portal = FakePortal(username, password).start()
+    portal.online = True
+    base_url = portal.url
+    if scenario == "dns_outage":
+        base_url = base_url.replace("127.0.0.1", PORTAL_HOST)
+    get_resolver().clear()
+    config = {
+        "username": username,
+        "password": password,
+        "login_url": base_url,
+        "test_url": base_url + "generate_204",
+        "portal_check_url": base_url + "generate_204",
+        "route_check_address": "127.0.0.1",
+        "probe_method": "http",
+        "http_probe_timeout": 1,
+        "login_engine": engine,
+        "login_fallback_selenium": False,
+        "http_login_timeout": 2,
+        # 模拟门户的探测与登录不能写进用户的历史记录
+        "history_enabled": False,
+    }
+    config.update(SCHEDULES[schedule_name])
+    if scenario == "dns_outage":
+        # 缩短成功结果的缓存时间，让断网期间确实发生解析（并失败）
+        config["dns_positive_ttl"] = 2
+    inst = InstrumentedChecker(config)
+    thread = threading.Thread(target=inst.checker.start_checking, daemon=True)
+    detect, login, downtime = [], [], []
+    failures = 0
+    interval = config["check_interval"]
+    original_getaddrinfo = _patch_getaddrinfo() if scenario == "dns_outage" else None
+    try:
+        thread.start()
+        time.sleep(1)
+        for _ in range(outages):
+            # 断网发生在检查周期中的随机时刻
+            time.sleep(random.uniform(0, interval))
+            result = run_outage(portal, inst, scenario, link_down_for=interval / 2, deadline=interval * 6)
+            if result is None:
+                failures += 1
+                continue
+            d, l, t = result
+            detect.append(d)
+            if l is not None:
+                login.append(l)
+            downtime.append(t)
+    finally:
+        inst.checker.stop_checking()
+        thread.join(timeout=10)
+        portal.stop()
+        if original_getaddrinfo is not None:
+            _dns_down.clear()
+            socket.getaddrinfo = original_getaddrinfo
+    return {
+        "engine": engine,
+        "schedule": schedule_name,
+        "scenario": scenario,
+        "outages": outages,
+        "unrecovered": failures,
+        "detection_latency_s": summarize(detect),
+        "login_latency_s": summarize(login),
+        "downtime_s": summarize(downtime),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='断网检测与恢复时间基准测试')
+    parser.add_argument('--engines', nargs='+', default=['http'], help='http / selenium')
+    parser.add_argument('--schedules', nargs='+', default=list(SCHEDULES), choices=list(SCHEDULES))
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--outages', type=int, default=10, help='每组场景的断网次数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    history_before = history_fingerprint()
+    results = []
+    for engine in args.engines:
+        for schedule_name in args.schedules:
+            for scenario in args.scenarios:
+                print(f"运行: engine={engine} schedule={schedule_name} scenario={scenario}")
+                case = run_case(engine, schedule_name, scenario, args.outages, "bench", "bench")
+                results.append(case)
+                print(f"  检测 p50={case['detection_latency_s']['p50']} "
+                      f"登录 p50={case['login_latency_s']['p50']} "
+                      f"断网 p50={case['downtime_s']['p50']} 未恢复={case['unrecovered']}")
+
+    report = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "schedules": {k: SCHEDULES[k] for k in args.schedules},
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+    if history_fingerprint() != history_before:
+        raise SystemExit(f"基准运行修改了历史数据库 {HISTORY_DB}")
+
+if __name__ == "__main__":
+    main()
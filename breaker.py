@@ -0,0 +1,153 @@
+"""登录熔断器：门户故障或账号密码错误时，避免每个检查间隔都重新启动浏览器登录
+
+- closed:    正常放行；连续失败达到 login_failure_threshold 次后转为 open
+- open:      拒绝登录，冷却 login_cooldown 秒（每次重新打开翻倍，最多 login_max_cooldown 秒，带抖动）
+- half_open: 冷却结束后放行一次试探登录，成功则恢复 closed，失败则重新 open
+- 任何状态下，最近一小时的登录次数达到 login_hourly_budget 时也拒绝登录（0 表示不限）
+
+同时累计登录消耗的 CPU 秒数（登录线程自身加上本次登录使用的浏览器进程树，
+不含本进程的其它线程和其它配置的浏览器；见 measure）和墙钟秒数。
+"""
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_NAMES = {
+    CLOSED: "正常",
+    OPEN: "熔断",
+    HALF_OPEN: "试探",
+}
+
+@dataclass
+class BreakerSnapshot:
+    state: str
+    consecutive_failures: int
+    next_attempt_at: float  # 下一次允许登录的时间（time.time()），None 表示现在即可
+    attempts_last_hour: int
+    cpu_seconds: float
+    wall_seconds: float
+    logins: int
+
+class LoginBreaker:
+    def __init__(self, failure_threshold=3, cooldown=300, max_cooldown=3600, jitter=0.2, hourly_budget=12,
+                 clock=time.time):
+        self.failure_threshold = int(failure_threshold)
+        self.cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self.jitter = float(jitter)
+        self.hourly_budget = int(hourly_budget)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._trips = 0
+        self._open_until = 0.0
+        self._attempts = deque()
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.logins = 0
+
+    def configure(self, config):
+        """从配置读取熔断参数"""
+        with self._lock:
+            self.failure_threshold = max(1, int(config.get('login_failure_threshold', self.failure_threshold)))
+            self.cooldown = float(config.get('login_cooldown', self.cooldown))
+            self.max_cooldown = max(self.cooldown, float(config.get('login_max_cooldown', self.max_cooldown)))
+            self.jitter = float(config.get('login_cooldown_jitter', self.jitter))
+            self.hourly_budget = int(config.get('login_hourly_budget', self.hourly_budget))
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trips = 0
+            self._open_until = 0.0
+
+    def _expire_attempts(self, now):
+        while self._attempts and self._attempts[0] <= now - 3600:
+            self._attempts.popleft()
+
+    def _budget_until(self, now):
+        """预算用尽时返回恢复可用的时间，否则返回 None"""
+        self._expire_attempts(now)
+        if self.hourly_budget > 0 and len(self._attempts) >= self.hourly_budget:
+            return self._attempts[0] + 3600
+        return None
+
+    def allow(self):
+        """是否允许现在登录，返回 (允许, 不允许时的原因)；open 冷却结束时转为 half_open"""
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN:
+                if now < self._open_until:
+                    return False, f"登录熔断中，{self._open_until - now:.0f} 秒后再试"
+                self.state = HALF_OPEN
+            budget_until = self._budget_until(now)
+            if budget_until is not None:
+                return False, f"最近一小时已登录 {len(self._attempts)} 次，达到上限，{budget_until - now:.0f} 秒后再试"
+            return True, ""
+
+    def record(self, ok, cpu_seconds=0.0, wall_seconds=0.0):
+        """记录一次登录结果与消耗，返回状态是否发生变化"""
+        with self._lock:
+            now = self._clock()
+            previous = self.state
+            self._attempts.append(now)
+            self.logins += 1
+            self.cpu_seconds += cpu_seconds
+            self.wall_seconds += wall_seconds
+            if ok:
+                self.state = CLOSED
+                self.consecutive_failures = 0
+                self._trips = 0
+            else:
+                self.consecutive_failures += 1
+                if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                    cooldown = min(self.max_cooldown, self.cooldown * 2 ** self._trips)
+                    cooldown *= 1 + random.uniform(-self.jitter, self.jitter)
+                    self._open_until = now + cooldown
+                    self._trips += 1
+                    self.state = OPEN
+            return self.state != previous
+
+    @contextmanager
+    def measure(self, extra_cpu=None):
+        """统计代码块消耗的 CPU 与墙钟时间，结果由调用方通过 record() 提交
+
+        CPU 只计调用线程（time.thread_time()），extra_cpu 为可选的累计 CPU 秒数函数，
+        如登录所用浏览器进程树的 CPU（NetworkChecker.browser_cpu_seconds）。
+        用法: with breaker.measure() as cost: ...; breaker.record(ok, *cost)
+        """
+        cost = [0.0, 0.0]
+        cpu = time.thread_time() + (extra_cpu() if extra_cpu else 0.0)
+        wall = time.perf_counter()
+        try:
+            yield cost
+        finally:
+            cost[0] = max(0.0, time.thread_time() + (extra_cpu() if extra_cpu else 0.0) - cpu)
+            cost[1] = time.perf_counter() - wall
+
+    def next_attempt_at(self):
+        with self._lock:
+            now = self._clock()
+            candidates = []
+            if self.state == OPEN and self._open_until > now:
+                candidates.append(self._open_until)
+            budget_until = self._budget_until(now)
+            if budget_until is not None:
+                candidates.append(budget_until)
+            return max(candidates) if candidates else None
+
+    def snapshot(self):
+        next_at = self.next_attempt_at()
+        with self._lock:
+            self._expire_attempts(self._clock())
+            return BreakerSnapshot(self.state, self.consecutive_failures, next_at, len(self._attempts),
+                                   self.cpu_seconds, self.wall_seconds, self.logins)
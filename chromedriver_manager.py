@@ -1,15 +1,78 @@
-import latest_chromedriver
+import os
+import time
+import threading
 import ubelt as ub
-from logger import log 
+from logger import log
+from platform_utils import chrome_executable
 
-def check_chrome_chromedriver_matched(extra_para = True):
-    chrome_version = latest_chromedriver.chrome_info.get_version()
+# 版本匹配结果缓存：以 Chrome 与 ChromeDriver 可执行文件的 (路径, 大小, 修改时间) 为键
+_match_lock = threading.Lock()
+_match_key = None
+_match_status = None
+
+def _file_fingerprint(path):
+    if not path:
+        return (None, None, None)
+    try:
+        st = os.stat(path)
+        return (path, st.st_size, st.st_mtime)
+    except OSError:
+        return (path, None, None)
+
+def _latest():
+    """延迟导入 latest_chromedriver，避免拖慢启动"""
+    import latest_chromedriver
+    return latest_chromedriver
+
+def _chrome_path():
+    get_path = getattr(_latest().chrome_info, 'get_path', None)
+    if get_path is not None:
+        try:
+            path = get_path()
+            if path:
+                return path
+        except Exception:
+            pass
+    return chrome_executable()
+
+def _cache_key(dpath):
+    drivers = [os.path.join(dpath, name) for name in ("chromedriver.exe", "chromedriver")]
+    return (_file_fingerprint(_chrome_path()),) + tuple(_file_fingerprint(p) for p in drivers)
+
+def get_match_status():
+    """返回最近一次版本检查结果（不会重新探测），未检查过时返回 None"""
+    with _match_lock:
+        return dict(_match_status) if _match_status else None
+
+def invalidate_match_cache():
+    """使缓存失效，下次检查将重新获取版本（如登录时遇到版本错误）"""
+    global _match_key
+    with _match_lock:
+        _match_key = None
+
+def check_chrome_chromedriver_matched(extra_para = True, force = False):
+    global _match_key, _match_status
+    latest_chromedriver = _latest()
     dpath = ub.ensure_app_cache_dir('AutoConnect_chromedriver')
+    key = _cache_key(dpath)
+    with _match_lock:
+        cached = _match_status if _match_key == key else None
+    if cached and key[0][0] is None and cached["chrome_version"]:
+        # 找不到 Chrome 可执行文件时无法察觉浏览器升级，已知版本的结果不能复用
+        cached = None
+    # 已匹配、无网络且已知结果，或 Chrome 版本未知（在 Chrome 可执行文件变化前重查也无济于事）时无需重复检查
+    if cached and not force and (cached["matched"] or not extra_para or cached["chrome_version"] is None):
+        return cached["matched"]
+
+    chrome_version = latest_chromedriver.chrome_info.get_version()
     chromedriver_version  = latest_chromedriver.download_driver.get_version(dpath)
+    matched = None
     if chrome_version and chromedriver_version:
         major_chrome_version = chrome_version.split('.')
         major_chromedriver_version = chromedriver_version.split('.')
+        matched = True
         if major_chrome_version[0] != major_chromedriver_version[0] and major_chrome_version[1] != major_chromedriver_version[1] and major_chrome_version[2] != major_chromedriver_version[2]:
+            matched = False
             if extra_para:
                 latest_chromedriver.download_only_if_needed(chromedriver_folder=dpath)
                 log("检测到 ChromeDriver 版本与 Chrome 浏览器不匹配，已自动更新 ChromeDriver", "INFO")
@@ -25,5 +88,17 @@ def check_chrome_chromedriver_matched(extra_para = True):
         else:
             log("无法获取 ChromeDriver 版本信息，且无网络连接，无法重新下载 ChromeDriver", "WARNING")
 
+    with _match_lock:
+        # 下载可能改变了驱动文件，以更新后的指纹作为键
+        _match_key = _cache_key(dpath)
+        _match_status = {
+            "chrome_version": chrome_version,
+            "chromedriver_version": chromedriver_version,
+            "matched": matched,
+            "checked_at": time.time(),
+        }
+    return matched
+
 if __name__ == "__main__":
-    check_chrome_chromedriver_matched()
\ No newline at end of file
+    check_chrome_chromedriver_matched()
+    print(get_match_status())
@@ -0,0 +1,141 @@
+"""探测失败后的原因分类，决定是否值得登录
+
+- link_down: 没有到外网的路由（网线拔出、Wi-Fi 关闭、网卡未启用）
+- dns_down:  DNS 无法解析（门户域名也解析失败）
+- portal:    认证门户拦截（generate_204 被重定向或改写，或门户报告未在线）
+- upstream:  本地网络与门户都正常，但外网不可达（登录也无济于事）
+
+只有 portal 需要登录。
+"""
+import ssl
+import errno
+import socket
+import http.client
+from urllib.parse import urlparse
+
+from dns_cache import get_resolver, DnsLookupError
+
+LINK_DOWN = "link_down"
+DNS_DOWN = "dns_down"
+PORTAL = "portal"
+UPSTREAM = "upstream"
+
+FAILURE_NAMES = {
+    LINK_DOWN: "链路断开（无路由或网卡未连接）",
+    DNS_DOWN: "DNS 不可用",
+    PORTAL: "认证门户拦截",
+    UPSTREAM: "上游网络故障",
+}
+
+DEFAULT_PORTAL_CHECK_URL = "http://connect.rom.miui.com/generate_204"
+DEFAULT_ROUTE_CHECK_ADDRESS = "223.5.5.5"
+
+_NO_ROUTE_ERRNOS = {errno.ENETUNREACH, errno.EHOSTUNREACH, errno.EADDRNOTAVAIL,
+                    getattr(errno, "ENETDOWN", errno.ENETUNREACH)}
+
+def has_route(address=DEFAULT_ROUTE_CHECK_ADDRESS, source=None):
+    """UDP connect 只查路由表、不发送数据，失败说明没有可用的出口"""
+    try:
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            if source:
+                sock.bind((source, 0))
+            sock.connect((address, 53))
+        return True
+    except OSError as e:
+        if e.errno in _NO_ROUTE_ERRNOS:
+            return False
+        raise
+
+class FailureClassifier:
+    def __init__(self, login_url, portal_check_url=DEFAULT_PORTAL_CHECK_URL,
+                 route_check_address=DEFAULT_ROUTE_CHECK_ADDRESS, timeout=3.0, source=None, resolver=None):
+        self.login_url = login_url
+        self.portal_host = urlparse(login_url).hostname or ""
+        self.portal_check_url = portal_check_url
+        self.route_check_address = route_check_address
+        self.timeout = float(timeout)
+        self.source = source or None
+        self.resolver = resolver or get_resolver()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get('login_url') or "https://gw.buaa.edu.cn/",
+            config.get('portal_check_url') or DEFAULT_PORTAL_CHECK_URL,
+            config.get('route_check_address') or DEFAULT_ROUTE_CHECK_ADDRESS,
+            float(config.get('classify_timeout', 3)),
+            config.get('source_address') or None,
+        )
+
+    def classify(self):
+        """返回 (分类, 说明)"""
+        try:
+            if not has_route(self.route_check_address, self.source):
+                return LINK_DOWN, f"没有到 {self.route_check_address} 的路由"
+        except OSError as e:
+            return LINK_DOWN, f"路由检查失败: {e}"
+
+        check_dns_ok = True
+        try:
+            status, location = self._check_204()
+        except DnsLookupError:
+            check_dns_ok, status, location = False, None, ""
+        if status == 204:
+            return UPSTREAM, f"{self.portal_check_url} 正常返回 204，仅探测目标不可达"
+        if status is not None:
+            # generate_204 不会自行跳转或返回内容，出现即说明被门户拦截
+            if location:
+                return PORTAL, f"{self.portal_check_url} 被重定向到 {location}"
+            return PORTAL, f"{self.portal_check_url} 返回 {status}（应为 204，疑似被门户改写）"
+
+        # 204 检查本身失败（连接或解析失败），直接询问门户
+        if self.portal_host:
+            try:
+                self.resolver.resolve(self.portal_host, self.timeout)
+            except DnsLookupError as e:
+                return DNS_DOWN, str(e)
+        online = self._portal_online()
+        if online is False:
+            return PORTAL, "门户报告当前未在线"
+        if online is True:
+            return UPSTREAM, "门户报告已在线，但外网不可达"
+        if not check_dns_ok:
+            return DNS_DOWN, f"无法解析 {urlparse(self.portal_check_url).hostname}"
+        return UPSTREAM, "外网与认证门户均不可达"
+
+    def _check_204(self):
+        """请求 generate_204，不跟随跳转；返回 (状态码, Location)，连接失败时状态码为 None"""
+        parsed = urlparse(self.portal_check_url)
+        host = parsed.hostname or ""
+        addrs = self.resolver.resolve(host, self.timeout)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        source = (self.source, 0) if self.source else None
+        for addr in addrs:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+            try:
+                conn.sock = socket.create_connection((addr, port), self.timeout, source_address=source)
+                if parsed.scheme == "https":
+                    conn.sock = ssl.create_default_context().wrap_socket(conn.sock, server_hostname=host)
+                conn.request("GET", parsed.path or "/generate_204", headers={"User-Agent": "AutoConnect"})
+                resp = conn.getresponse()
+                resp.read(1024)
+                return resp.status, resp.getheader("Location") or ""
+            except (OSError, http.client.HTTPException):
+                continue
+            finally:
+                conn.close()
+        return None, ""
+
+    def _portal_online(self):
+        """通过 rad_user_info 询问深澜门户是否在线；门户不可达时返回 None"""
+        from srun_login import SrunPortalClient
+        try:
+            info = SrunPortalClient(self.login_url, timeout=self.timeout, source_address=self.source).user_info()
+        except Exception:
+            return None
+        if info.get("error") == "not_online_error":
+            return False
+        if info.get("error") == "ok" or info.get("user_name"):
+            return True
+        return None
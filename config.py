@@ -1,58 +1,284 @@
 import json
 import os
+import tempfile
+import threading
 import ubelt as ub
 from crypto_utils import encrypt_data, decrypt_data
-from logger import log
+from logger import (log, LOG_ROTATION, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_COMPRESS,
+                    LOG_QUEUE_SIZE, LOG_OVERFLOW)
 
 dpath = ub.ensure_app_cache_dir('AutoConnect_chromedriver')
 CONFIG_FILE = os.path.join(dpath, "config.json")
 LOG_FILE = os.path.join(dpath, 'auto_connect.log')
 
-def load_config():
-    """加载配置文件，如果不存在则创建默认配置"""
-    default_config = {
-        "username": "",
-        "password": "",
-        "check_interval": 300,
-        "test_url": "https://kimi.moonshot.cn",
-        "login_url": "https://gw.buaa.edu.cn/",
-        "log_file_path": LOG_FILE,
-        "chrome_version": "",
-        "chromedriver_path": "",
-        "chromedriver_version": ""
-    }
-    
-    if not os.path.exists(CONFIG_FILE):
-        save_config(default_config)
-        return default_config
-    
+DEFAULT_CONFIG = {
+    "username": "",
+    "password": "",
+    "check_interval": 300,
+    "test_url": "https://kimi.moonshot.cn",
+    "login_url": "https://gw.buaa.edu.cn/",
+    "login_engine": "http",
+    "login_fallback_selenium": True,
+    "warm_driver": False,
+    "scripted_fill": True,
+    "login_timeout": 10,
+    "login_poll_interval": 0.2,
+    "login_success_url_keyword": "success",
+    "probe_method": "auto",
+    "probe_timeout": 1.5,
+    "http_probe_timeout": 3,
+    "probe_quorum": 1,
+    "probe_deadline": None,
+    "fast_recheck_interval": 5,
+    "stable_checks": 2,
+    "dns_positive_ttl": 300,
+    "dns_negative_ttl": 30,
+    "dns_timeout": 2,
+    "dns_offline_ttl": 3,
+    "source_address": "",
+    "classify_failures": True,
+    "portal_check_url": "http://connect.rom.miui.com/generate_204",
+    "route_check_address": "223.5.5.5",
+    "classify_timeout": 3,
+    "login_failure_threshold": 3,
+    "login_cooldown": 300,
+    "login_max_cooldown": 3600,
+    "login_cooldown_jitter": 0.2,
+    "login_hourly_budget": 12,
+    "session_renewal": False,
+    "session_poll_interval": 600,
+    "session_max_duration": 0,
+    "session_renew_margin": 300,
+    "session_renew_force": 30,
+    "session_idle_poll": 5,
+    "session_idle_rate": 10240,
+    "metrics_port": 0,
+    "metrics_json_path": "",
+    "metrics_json_interval": 60,
+    "memory_report_interval": 3600,
+    "history_enabled": True,
+    "history_raw_days": 7,
+    "history_keep_days": 365,
+    "fleet_probe_workers": 32,
+    "fleet_login_workers": 4,
+    "log_file_path": LOG_FILE,
+    "log_max_lines": 5000,
+    "log_flush_interval": 100,
+    "log_rotation": LOG_ROTATION,
+    "log_max_bytes": LOG_MAX_BYTES,
+    "log_backup_count": LOG_BACKUP_COUNT,
+    "log_compress": LOG_COMPRESS,
+    "log_queue_size": LOG_QUEUE_SIZE,
+    "log_overflow": LOG_OVERFLOW,
+    "config_watch_interval": 2,
+    "chrome_version": "",
+    "chromedriver_path": "",
+    "chromedriver_version": ""
+}
+
+def _read_config_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    # 解密用户名和密码
+    if config.get("username"):
+        config["username"] = decrypt_data(config["username"])
+    if config.get("password"):
+        config["password"] = decrypt_data(config["password"])
+    return config
+
+def _with_defaults(config):
+    """以 DEFAULT_CONFIG 为底合并文件中的配置，缺少的键取默认值"""
+    merged = dict(DEFAULT_CONFIG)
+    merged.update(config)
+    return merged
+
+def _check_config(config):
+    """校验运行时无法纠正的配置项，无效时抛出 ValueError"""
+    from probes import check_targets
+    check_targets(config.get("test_url"))
+
+def _write_config_file(path, config):
+    """加密副本后写入临时文件再原子替换，不修改传入的字典"""
+    data = dict(config)
+    if data.get("username"):
+        data["username"] = encrypt_data(data["username"])
+    if data.get("password"):
+        data["password"] = encrypt_data(data["password"])
+    fd, tmp = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=os.path.dirname(path) or ".")
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            # 解密用户名和密码
-            if config.get("username"):
-                config["username"] = decrypt_data(config["username"])
-            if config.get("password"):
-                config["password"] = decrypt_data(config["password"])
-            return config
-    except Exception as e:
-        log(f"加载配置失败: {e}", "ERROR")
-        return default_config
-    
-def save_config(config):
-    """保存配置到文件"""
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def _fingerprint(path):
     try:
-        # 加密用户名和密码
-        if config.get("username"):
-            config["username"] = encrypt_data(config["username"])
-        if config.get("password"):
-            config["password"] = encrypt_data(config["password"])
-
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        log(f"保存配置失败: {e}", "ERROR")
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+class ConfigStore:
+    """进程内唯一的已解密配置
+
+    - 内部字典从不原地修改，更新时复制后整体替换（写时复制），读取方拿到的是独立副本
+    - 保存时写临时文件再 os.replace，避免半写入的配置文件
+    - subscribe 的回调在更新所在线程中以 (新配置副本, 变更键集合) 调用
+    - start_watcher 轮询文件指纹，外部编辑后自动重新加载；解析失败的文件在再次修改前不会重复读取
+    - 从文件读取的配置合并在 DEFAULT_CONFIG 之上，缺少的键取默认值
+    - test_url 在加载与保存时校验：启动时无效则改用默认目标，重新加载或保存时无效则拒绝
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._config = None
+        self._fingerprint = None
+        self._subscribers = {}
+        self._next_token = 0
+        self._watcher = None
+        self._watch_stop = threading.Event()
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._config is not None:
+                return
+            if not os.path.exists(self.path):
+                self._config = dict(DEFAULT_CONFIG)
+                self._persist(self._config)
+                return
+            # 先记录指纹：即使解析失败，监视线程也要等文件再次修改后才重新读取
+            self._fingerprint = _fingerprint(self.path)
+            try:
+                self._config = _with_defaults(_read_config_file(self.path))
+            except Exception as e:
+                log(f"加载配置失败: {e}", "ERROR")
+                self._config = dict(DEFAULT_CONFIG)
+                return
+            try:
+                _check_config(self._config)
+            except ValueError as e:
+                log(f"配置中的探测目标无效，改用默认目标: {e}", "ERROR")
+                self._config["test_url"] = DEFAULT_CONFIG["test_url"]
+
+    def _persist(self, config):
+        try:
+            _write_config_file(self.path, config)
+            self._fingerprint = _fingerprint(self.path)
+        except Exception as e:
+            log(f"保存配置失败: {e}", "ERROR")
+
+    def get(self):
+        """返回当前配置的副本"""
+        self._ensure_loaded()
+        return dict(self._config)
+
+    def update(self, changes, persist=True):
+        """合并变更并保存，返回实际发生变化的键；配置无效时抛出 ValueError，不做任何修改"""
+        self._ensure_loaded()
+        with self._lock:
+            old = self._config
+            changed = {k for k, v in changes.items() if k not in old or old[k] != v}
+            if not changed:
+                return changed
+            new = dict(old)
+            new.update(changes)
+            _check_config(new)
+            if persist:
+                self._persist(new)
+            self._config = new
+        self._notify(new, changed)
+        return changed
+
+    def reload(self):
+        """从文件重新加载（外部编辑或 SIGHUP），返回变化的键"""
+        self._ensure_loaded()
+        with self._lock:
+            self._fingerprint = _fingerprint(self.path)
+            try:
+                loaded = _with_defaults(_read_config_file(self.path))
+                _check_config(loaded)
+            except Exception as e:
+                log(f"重新加载配置失败: {e}", "ERROR")
+                return set()
+            old = self._config
+            changed = {k for k in set(old) | set(loaded) if old.get(k) != loaded.get(k)}
+            if not changed:
+                return changed
+            self._config = loaded
+        log(f"检测到配置文件变更: {', '.join(sorted(changed))}", "INFO")
+        self._notify(loaded, changed)
+        return changed
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = callback
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def _notify(self, config, changed):
+        with self._lock:
+            callbacks = list(self._subscribers.values())
+        for callback in callbacks:
+            try:
+                callback(dict(config), set(changed))
+            except Exception as e:
+                log(f"配置变更通知失败: {e}", "WARNING")
+
+    def start_watcher(self, interval=None):
+        """启动后台线程监视配置文件（重复调用无副作用）"""
+        self._ensure_loaded()
+        with self._lock:
+            if self._watcher and self._watcher.is_alive():
+                return
+            if interval is None:
+                interval = float(self._config.get('config_watch_interval', 2) or 0)
+            if interval <= 0:
+                return
+            self._watch_stop.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                             name="config-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watcher(self):
+        self._watch_stop.set()
+
+    def _watch(self, interval):
+        while not self._watch_stop.wait(interval):
+            current = _fingerprint(self.path)
+            if current is not None and current != self._fingerprint:
+                self.reload()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_config_store():
+    """进程内共享的配置存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConfigStore()
+        return _store
+
+def load_config():
+    """返回当前配置的副本（首次调用时从文件加载，不存在则创建默认配置）"""
+    return get_config_store().get()
+
+def save_config(config):
+    """保存配置到文件（不会修改传入的字典），返回变化的键；配置无效时抛出 ValueError"""
+    return get_config_store().update(config)
         
 if __name__ == "__main__":
     cfg = load_config()
-    print("当前配置:", cfg)
\ No newline at end of file
+    print("当前配置:", cfg)
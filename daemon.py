@@ -0,0 +1,112 @@
+"""无界面、低占用的 asyncio 守护进程模式（不导入 PyQt5）
+
+用法: python main.py --daemon
+- 探测与登录在线程池中执行，事件循环本身只负责调度与信号处理
+- SIGINT/SIGTERM 立即停止；POSIX 下 SIGHUP 重新加载配置并立即检查
+- 按 memory_report_interval 定期记录常驻内存
+"""
+import sys
+import signal
+import asyncio
+
+from logger import log
+from platform_utils import resident_memory_mb
+
+class MonitorDaemon:
+    def __init__(self, config):
+        from network_checker import NetworkChecker
+        self.checker = NetworkChecker(config)
+        self._wake = None
+        self._loop = None
+        self._stopping = False
+
+    def _set_wake(self):
+        # 可能从信号处理或其它线程调用，统一切回事件循环线程
+        if self._loop and self._wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def stop(self):
+        self._stopping = True
+        self.checker.is_running = False
+        self._set_wake()
+
+    def reload(self):
+        from config import get_config_store
+        if not get_config_store().reload():
+            log("配置文件未变化", "INFO")
+
+    def _on_config_changed(self, config, changed):
+        # 来自 SIGHUP 或配置文件监视线程
+        self.checker.config = config
+        log(f"已应用新配置: {', '.join(sorted(changed))}", "INFO")
+        self._set_wake()
+
+    def _install_signals(self, loop):
+        for sig, handler in ((signal.SIGINT, self.stop), (signal.SIGTERM, self.stop),
+                             (getattr(signal, "SIGHUP", None), self.reload)):
+            if sig is None:
+                continue
+            try:
+                loop.add_signal_handler(sig, handler)
+            except (NotImplementedError, RuntimeError):
+                # Windows 的事件循环不支持 add_signal_handler
+                if handler is self.stop:
+                    signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self.stop))
+
+    async def _report_memory(self, interval):
+        while not self._stopping:
+            rss = resident_memory_mb()
+            if rss is not None:
+                log(f"常驻内存: {rss:.1f} MB", "INFO")
+            try:
+                await asyncio.wait_for(self._stopped_event.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        loop = self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopped_event = asyncio.Event()
+        self._install_signals(loop)
+
+        config = self.checker.config
+        # 续期失败时唤醒本事件循环，而不是 NetworkChecker 自己的调度器
+        self.checker.renewer.on_lost = self._set_wake
+        await loop.run_in_executor(None, self.checker.begin_monitoring, "守护进程模式启动（无界面）")
+        from config import get_config_store
+        store = get_config_store()
+        config_token = store.subscribe(self._on_config_changed)
+        store.start_watcher()
+
+        report_interval = float(config.get('memory_report_interval') or 0)
+        reporter = asyncio.ensure_future(self._report_memory(report_interval)) if report_interval else None
+
+        while not self._stopping:
+            ok = await loop.run_in_executor(None, self.checker.run_once)
+            if self._stopping:
+                break
+            delay = self.checker.next_delay(ok)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+        self._stopped_event.set()
+        store.unsubscribe(config_token)
+        if reporter:
+            await reporter
+        await loop.run_in_executor(None, self.checker.stop_checking)
+        self.checker.end_monitoring("守护进程已停止")
+
+def run_daemon_main():
+    from config import load_config
+    daemon = MonitorDaemon(load_config())
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_daemon_main())
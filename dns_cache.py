@@ -0,0 +1,164 @@
+import socket
+import threading
+import time
+import ipaddress
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from metrics import get_metrics
+
+class DnsLookupError(OSError):
+    """解析失败（含超时），可能来自负缓存"""
+
+class DnsCache:
+    """带 TTL 的 DNS 缓存，供探测与登录共用
+
+    - 成功结果缓存 positive_ttl 秒（标准库拿不到记录本身的 TTL）
+    - 失败与超时缓存 negative_ttl 秒（断网期间至少一个复查间隔），期间直接失败，不再等待解析器；
+      命中失败结果时在后台重新解析，解析恢复后下一次查询即可命中
+    - 解析在后台守护线程中进行，调用方只等待 timeout 秒；同一主机的并发查询共享一次解析
+    - 断网期间解析到的地址可能被门户劫持，只缓存 offline_ttl 秒；
+      恢复在线时由 set_online() 一次性丢弃失败结果与断网期间的结果
+    """
+
+    def __init__(self, positive_ttl=300.0, negative_ttl=30.0, timeout=2.0, offline_ttl=3.0):
+        self.positive_ttl = float(positive_ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.timeout = float(timeout)
+        self.offline_ttl = float(offline_ttl)
+        self.recheck_interval = 0.0
+        self.offline = False
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.timeouts = 0
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        self.positive_ttl = float(config.get('dns_positive_ttl', self.positive_ttl))
+        self.negative_ttl = float(config.get('dns_negative_ttl', self.negative_ttl))
+        self.timeout = float(config.get('dns_timeout', self.timeout))
+        self.offline_ttl = float(config.get('dns_offline_ttl', self.offline_ttl))
+        self.recheck_interval = float(config.get('fast_recheck_interval', self.recheck_interval))
+
+    @staticmethod
+    def _lookup(host):
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        addrs = []
+        # IPv4 优先
+        for family in (socket.AF_INET, socket.AF_INET6):
+            for info in infos:
+                if info[0] == family and info[4][0] not in addrs:
+                    addrs.append(info[4][0])
+        if not addrs:
+            raise socket.gaierror(f"{host} 没有可用地址")
+        return addrs
+
+    def _start_lookup(self, host):
+        fut = Future()
+
+        def worker():
+            try:
+                addrs = self._lookup(host)
+            except Exception as e:
+                self._store(host, None, str(e))
+                fut.set_exception(e)
+                return
+            self._store(host, addrs, None)
+            fut.set_result(addrs)
+
+        threading.Thread(target=worker, name=f"dns-{host}", daemon=True).start()
+        return fut
+
+    def _ttl(self, error):
+        if error is None:
+            return min(self.positive_ttl, self.offline_ttl) if self.offline else self.positive_ttl
+        # 断网期间的复查探测不应再次等待已经见过的解析超时
+        return max(self.negative_ttl, self.recheck_interval) if self.offline else self.negative_ttl
+
+    def _store(self, host, addrs, error):
+        with self._lock:
+            self._entries[host] = (time.monotonic() + self._ttl(error), addrs, error, self.offline)
+            self._inflight.pop(host, None)
+
+    def resolve(self, host, timeout=None):
+        """返回地址列表，失败或超时抛出 DnsLookupError"""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > now:
+                if entry[2] is None:
+                    self.hits += 1
+                    return list(entry[1])
+                self.negative_hits += 1
+                if host not in self._inflight:
+                    self._inflight[host] = self._start_lookup(host)
+                raise DnsLookupError(f"DNS 解析失败（缓存）: {host} {entry[2]}")
+            self.misses += 1
+            fut = self._inflight.get(host)
+            if fut is None:
+                fut = self._start_lookup(host)
+                self._inflight[host] = fut
+
+        start = time.perf_counter()
+        try:
+            return list(fut.result(timeout=self.timeout if timeout is None else timeout))
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+                # 解析器卡住时先记为失败，后台解析完成后会覆盖该条目
+                self._entries[host] = (time.monotonic() + self._ttl("timeout"), None, "timeout", self.offline)
+            raise DnsLookupError(f"DNS 解析超时: {host}")
+        except DnsLookupError:
+            raise
+        except Exception as e:
+            raise DnsLookupError(f"DNS 解析失败: {host} {e}")
+        finally:
+            get_metrics().observe("dns", time.perf_counter() - start)
+
+    def resolve_ipv4(self, host, timeout=None):
+        for addr in self.resolve(host, timeout):
+            if ":" not in addr:
+                return addr
+        raise DnsLookupError(f"{host} 没有 IPv4 地址")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def drop_unreliable(self):
+        """丢弃失败结果与断网期间得到的结果，返回丢弃的条目数"""
+        with self._lock:
+            stale = [host for host, entry in self._entries.items() if entry[2] is not None or entry[3]]
+            for host in stale:
+                del self._entries[host]
+        return len(stale)
+
+    def set_online(self, online):
+        """记录网络状态，之后得到的结果按新状态决定缓存时长；断网恢复时丢弃一次不可靠的条目"""
+        if self.offline and online:
+            self.drop_unreliable()
+        self.offline = not online
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "timeouts": self.timeouts,
+                "entries": len(self._entries),
+            }
+
+_resolver = DnsCache()
+
+def get_resolver():
+    """进程内共享的解析缓存"""
+    return _resolver
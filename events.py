@@ -0,0 +1,105 @@
+"""监控事件与线程安全的事件总线（不依赖 PyQt5，守护进程模式同样可用）
+
+NetworkChecker 在监控线程中发布事件；订阅者的回调在发布线程中同步执行，
+界面侧应通过 qt_events.EventSignalBridge 转为 Qt 排队信号，在主线程中处理。
+"""
+import time
+import threading
+from dataclasses import dataclass, field
+
+from probes import ProbeResult
+from renewal import SessionStatus
+from logger import log
+
+@dataclass
+class MonitorStarted:
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class OutageStarted:
+    """由在线（或刚启动）变为探测失败"""
+    target: str
+    error: str = ""
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class FailureClassified:
+    """探测失败后的原因分类（classifier 中的 link_down / dns_down / portal / upstream）"""
+    kind: str
+    detail: str = ""
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class LoginAttempt:
+    """开始登录；attempt 为本次断网中的第几次重连，会话续期触发的登录为 None"""
+    attempt: int
+    engine: str
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class LoginSucceeded:
+    engine: str
+    duration: float
+    time_to_online: float = None
+    detail: str = ""
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class LoginFailed:
+    engine: str
+    duration: float
+    detail: str = ""
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class BreakerUpdated:
+    """登录熔断器状态与累计登录消耗（breaker.BreakerSnapshot 的字段）"""
+    state: str
+    next_attempt_at: float = None
+    cpu_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    logins: int = 0
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class MonitorStopped:
+    at: float = field(default_factory=time.time)
+
+# 每轮探测直接发布 probes.ProbeResult（含 RTT），会话续期直接发布 renewal.SessionStatus
+EVENT_TYPES = (MonitorStarted, ProbeResult, OutageStarted, FailureClassified, LoginAttempt,
+               LoginSucceeded, LoginFailed, BreakerUpdated, SessionStatus, MonitorStopped)
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._next_token = 0
+
+    def subscribe(self, callback, *event_types):
+        """订阅指定类型的事件（不指定则订阅全部），返回用于取消订阅的令牌"""
+        with self._lock:
+            self._next_token += 1
+            token = self._next_token
+            self._subscribers[token] = (callback, tuple(event_types))
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, event):
+        with self._lock:
+            targets = list(self._subscribers.values())
+        for callback, event_types in targets:
+            if event_types and not isinstance(event, event_types):
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                log(f"事件处理失败 ({type(event).__name__}): {e}", "WARNING")
+
+_bus = EventBus()
+
+def get_event_bus():
+    """进程内共享的事件总线"""
+    return _bus
@@ -0,0 +1,263 @@
+"""本地模拟的深澜认证门户，用于离线测试 HTTP / 浏览器两种登录方式
+
+用法: python fake_portal.py [--port 8801] [--username u] [--password p] [--session-seconds 600]
+
+session_seconds 模拟门户的会话时长：登录后到期自动下线，rad_user_info 返回 add_time 与 remain_seconds。
+与真实门户一样按客户端地址记录会话：不同源地址（如 127.0.0.2、127.0.0.3）各自登录、各自在线；
+accounts 可提供多个账号（用户名 -> 密码）。
+"""
+import json
+import time
+import secrets
+import threading
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from srun_login import hmac_md5, checksum, encode_info
+
+_LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Fake Srun Portal</title></head>
+<body>
+<form id="login-form" action="/form_login" method="post">
+  <input id="username" name="username" type="text">
+  <input id="password" name="password" type="password">
+  <button id="login" type="submit">登录</button>
+</form>
+</body></html>
+"""
+
+_SUCCESS_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Fake Srun Portal</title></head>
+<body><div id="logout">注销</div><span id="user_name">已在线</span></body></html>
+"""
+
+class FakePortal:
+    """线程内运行的模拟门户，按客户端地址记录在线会话与登录次数"""
+
+    def __init__(self, username="test", password="test", host="127.0.0.1", port=0, ac_id="1",
+                 session_seconds=None, accounts=None):
+        self.username = username
+        self.password = password
+        self.accounts = dict(accounts or {})
+        self.accounts.setdefault(username, password)
+        self.ac_id = ac_id
+        self.session_seconds = session_seconds
+        self.expired_count = 0
+        self._sessions = {}  # 客户端地址 -> [用户名, 登录时间]
+        self.link_down = False
+        self.login_count = 0
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def online(self):
+        """是否有任一客户端在线"""
+        with self._lock:
+            for ip in list(self._sessions):
+                self._expire(ip)
+            return bool(self._sessions)
+
+    @online.setter
+    def online(self, value):
+        """True 时让门户所在地址以默认账号上线，False 时踢下所有客户端"""
+        with self._lock:
+            if value:
+                self._set_online(self._server.server_address[0], self.username)
+            else:
+                self._sessions.clear()
+
+    @property
+    def online_count(self):
+        with self._lock:
+            for ip in list(self._sessions):
+                self._expire(ip)
+            return len(self._sessions)
+
+    def is_online(self, ip):
+        with self._lock:
+            return self._expire(ip) is not None
+
+    def _set_online(self, ip, username):
+        """上线并返回此前是否已在线（调用方持有锁）"""
+        if self._expire(ip) is not None:
+            return True
+        self._sessions[ip] = [username, time.time()]
+        return False
+
+    def _expire(self, ip):
+        """会话到期则下线，返回仍有效的会话（调用方持有锁）"""
+        session = self._sessions.get(ip)
+        if session and self.session_seconds and time.time() - session[1] >= self.session_seconds:
+            del self._sessions[ip]
+            self.expired_count += 1
+            return None
+        return session
+
+    def logout(self):
+        """踢下所有客户端"""
+        with self._lock:
+            self._sessions.clear()
+
+    def _challenge(self, ip):
+        token = secrets.token_hex(32)
+        with self._lock:
+            self._tokens[ip] = token
+        return token
+
+    def _verify_login(self, q, ip):
+        with self._lock:
+            token = self._tokens.pop(ip, None)
+        if token is None:
+            return {"error": "challenge_expire_error", "error_msg": "challenge_expire_error"}
+        username = q.get("username", "")
+        password = self.accounts.get(username)
+        if password is None:
+            return {"error": "login_error", "error_msg": "E2901: (Third party 1)bind_user2: ldap_bind error"}
+        ac_id = q.get("ac_id", "")
+        hmd5 = hmac_md5(password, token)
+        info = encode_info(username, password, q.get("ip", ip), ac_id, token)
+        expected = checksum(token, username, hmd5, ac_id, q.get("ip", ip), q.get("n", ""), q.get("type", ""), info)
+        if q.get("password") != "{MD5}" + hmd5 or q.get("info") != info:
+            return {"error": "login_error", "error_msg": "E2901: (Third party 1)bind_user2: ldap_bind error"}
+        if q.get("chksum") != expected:
+            return {"error": "sign_error", "error_msg": "sign_error"}
+        with self._lock:
+            already = self._set_online(ip, username)
+            self.login_count += 1
+        if already:
+            return {"error": "ip_already_online_error", "error_msg": "ip_already_online_error"}
+        return {"error": "ok", "res": "ok", "suc_msg": "login_ok", "online_ip": ip}
+
+    def _form_login(self, username, password, ip):
+        """浏览器表单登录（供 Selenium 方式测试）"""
+        if password is None or self.accounts.get(username) != password:
+            return False
+        with self._lock:
+            self._set_online(ip, username)
+            self.login_count += 1
+        return True
+
+    def _user_info(self, ip):
+        with self._lock:
+            session = self._expire(ip)
+            if session is None:
+                return {"error": "not_online_error", "client_ip": ip, "online_ip": ip}
+            username, login_at = session
+            info = {"error": "ok", "user_name": username, "online_ip": ip,
+                    "add_time": int(login_at), "sum_seconds": int(time.time() - login_at),
+                    "remain_seconds": 0, "remain_bytes": 0}
+            if self.session_seconds:
+                info["remain_seconds"] = max(0, int(login_at + self.session_seconds - time.time()))
+            return info
+
+    def _logout(self, q, ip):
+        with self._lock:
+            session = self._expire(ip)
+            if session is None or q.get("username") != session[0]:
+                return {"error": "not_online_error", "error_msg": "not_online_error"}
+            del self._sessions[ip]
+        return {"error": "ok", "res": "ok", "suc_msg": "logout_ok"}
+
+    def _make_handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, code, body=b"", ctype="text/html; charset=utf-8", headers=None):
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _jsonp(self, q, data):
+                cb = q.get("callback", "callback")
+                self._send(200, f"{cb}({json.dumps(data)})".encode("utf-8"), "text/javascript; charset=utf-8")
+
+            def do_GET(self):
+                if portal.link_down:
+                    # 模拟断链：不返回任何响应直接断开
+                    self.close_connection = True
+                    return
+                parsed = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                ip = self.client_address[0]
+                path = parsed.path
+                if path == "/":
+                    self._send(302, headers={"Location": f"/srun_portal_pc?ac_id={portal.ac_id}&theme=buaa"})
+                elif path == "/srun_portal_pc":
+                    self._send(200, _LOGIN_PAGE.encode("utf-8"))
+                elif path == "/srun_portal_success":
+                    self._send(200, _SUCCESS_PAGE.encode("utf-8"))
+                elif path == "/cgi-bin/get_challenge":
+                    self._jsonp(q, {"challenge": portal._challenge(ip), "client_ip": ip, "res": "ok", "error": "ok"})
+                elif path == "/cgi-bin/srun_portal" and q.get("action") == "logout":
+                    self._jsonp(q, portal._logout(q, ip))
+                elif path == "/cgi-bin/srun_portal":
+                    self._jsonp(q, portal._verify_login(q, ip))
+                elif path == "/cgi-bin/rad_user_info":
+                    self._jsonp(q, portal._user_info(ip))
+                elif path == "/generate_204":
+                    if portal.is_online(ip):
+                        self._send(204)
+                    else:
+                        self._send(302, headers={"Location": portal.url})
+                else:
+                    self._send(404, b"not found")
+
+            def do_POST(self):
+                if portal.link_down:
+                    self.close_connection = True
+                    return
+                if urlparse(self.path).path != "/form_login":
+                    self._send(404, b"not found")
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+                if portal._form_login(form.get("username", ""), form.get("password"), self.client_address[0]):
+                    self._send(303, headers={"Location": f"/srun_portal_success?ac_id={portal.ac_id}"})
+                else:
+                    self._send(200, _LOGIN_PAGE.encode("utf-8"))
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟深澜认证门户')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8801)
+    parser.add_argument('--username', default='test')
+    parser.add_argument('--password', default='test')
+    parser.add_argument('--session-seconds', type=float, default=None, help='会话时长（秒），到期自动下线')
+    args = parser.parse_args()
+    portal = FakePortal(args.username, args.password, args.host, args.port,
+                        session_seconds=args.session_seconds)
+    print(f"模拟门户已启动: {portal.url}")
+    try:
+        portal._server.serve_forever()
+    except KeyboardInterrupt:
+        portal._server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""批量监控模式：在一个进程中同时监控多个配置（多台机器 / 多个账号）
+
+用法: python main.py --fleet profiles.json
+
+profiles.json 格式：
+    {
+        "defaults": {"check_interval": 60, "login_url": "https://gw.buaa.edu.cn/"},
+        "profiles": [
+            {"name": "lab-01", "username": "...", "password": "...",
+             "test_url": "https://www.baidu.com", "source_address": "10.0.0.11"},
+            ...
+        ]
+    }
+也可以直接是配置列表。每个配置依次以 config.json、defaults、自身字段合并；
+source_address 为可选的本机源地址，探测与登录都从该地址发出。
+
+- 所有配置共用一个 asyncio 事件循环调度，各自按 AdaptiveScheduler 计算下一次检查时间
+- 探测在有界线程池中执行（fleet_probe_workers），登录在更小的有界线程池中排队（fleet_login_workers）
+- 只支持 HTTP 登录方式，不会为每个配置启动浏览器；断网时先分类（classifier.py），只在门户拦截时登录
+- 只在状态变化（断网、恢复、登录结果）时写日志，避免上千个配置刷屏
+"""
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import log
+from metrics import get_metrics
+from scheduler import AdaptiveScheduler
+from probes import make_multi_probe, check_targets, ProbeUnavailable
+from classifier import FailureClassifier, FAILURE_NAMES, PORTAL
+from breaker import LoginBreaker, STATE_NAMES, CLOSED
+
+class ProfileMonitor:
+    """单个配置的监控状态"""
+
+    def __init__(self, name, config, probe_executor):
+        self.name = name
+        self.config = config
+        self.scheduler = AdaptiveScheduler()
+        self.scheduler.configure(config)
+        self.breaker = LoginBreaker()
+        self.breaker.configure(config)
+        quorum = config.get('probe_quorum', 1)
+        if str(quorum).strip().lower() == "first":
+            quorum = 1
+        timeout = config.get('probe_timeout') or None
+        http_timeout = config.get('http_probe_timeout') or None
+        deadline = config.get('probe_deadline') or None
+        self.probe = make_multi_probe(
+            config.get('test_url'), config.get('probe_method', 'auto'),
+            float(timeout) if timeout else None, int(quorum),
+            float(deadline) if deadline else None,
+            config.get('source_address') or None, probe_executor,
+            http_timeout=float(http_timeout) if http_timeout else None,
+        )
+        self.online = None
+        self.checks = 0
+        self.failures = 0
+        self.logins = 0
+        self.last_rtt = None
+        self.failure_kind = None
+
+    def classify(self):
+        """返回断网原因分类；未启用时返回 None（照常登录）"""
+        if not self.config.get('classify_failures', True):
+            return None
+        try:
+            kind, _ = FailureClassifier.from_config(self.config).classify()
+        except Exception:
+            return None
+        get_metrics().inc(f"failure_{kind}")
+        return kind
+
+    def probe_once(self):
+        """返回探测结果；探测方式不可用（无法判断网络状态）时返回 None"""
+        try:
+            return self.probe()
+        except ProbeUnavailable as e:
+            log(f"[{self.name}] 探测方式 {self.probe.method} 不可用，跳过登录: {e}", "WARNING")
+            return None
+
+def load_profiles(path, base=None):
+    """读取配置列表，返回 [(name, config)]"""
+    if base is None:
+        from config import load_config
+        base = load_config()
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"profiles": data}
+    defaults = data.get("defaults") or {}
+    profiles = []
+    for i, item in enumerate(data.get("profiles") or []):
+        config = dict(base)
+        config.update(defaults)
+        config.update(item)
+        name = str(item.get("name") or f"profile-{i + 1}")
+        try:
+            check_targets(config.get('test_url'))
+        except ValueError as e:
+            raise ValueError(f"配置 {name}: {e}") from None
+        profiles.append((name, config))
+    return profiles
+
+class FleetRunner:
+    def __init__(self, profiles, probe_workers=32, login_workers=4):
+        self._probe_pool = ThreadPoolExecutor(max_workers=probe_workers, thread_name_prefix="fleet-probe")
+        # 多目标配置的子探测使用独立线程池，避免与外层探测互相等待
+        self._target_pool = ThreadPoolExecutor(max_workers=probe_workers, thread_name_prefix="fleet-target")
+        self._login_pool = ThreadPoolExecutor(max_workers=login_workers, thread_name_prefix="fleet-login")
+        self.monitors = [ProfileMonitor(name, config, self._target_pool) for name, config in profiles]
+        self._stop = None
+        self._loop = None
+
+    def stop(self):
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def _install_signals(self, loop):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(sig, lambda *_: self.stop())
+
+    async def _sleep(self, delay):
+        try:
+            await asyncio.wait_for(self._stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    def _timed_login(config):
+        """在登录线程中执行 HTTP 登录，返回 (是否成功, 本线程消耗的 CPU 秒数, 登录墙钟秒数, 开始时刻)
+
+        墙钟时间在登录线程内测量，不含在登录线程池中排队的时间。
+        """
+        from srun_login import http_login
+        started = time.perf_counter()
+        cpu = time.thread_time()
+        ok = http_login(config)
+        return ok, time.thread_time() - cpu, time.perf_counter() - started, started
+
+    async def _login(self, monitor):
+        metrics = get_metrics()
+        allowed, _ = monitor.breaker.allow()
+        if not allowed:
+            metrics.inc("login_blocked")
+            return
+        metrics.inc("login_attempt")
+        queued = time.perf_counter()
+        ok, cpu, elapsed, started = await self._loop.run_in_executor(self._login_pool, self._timed_login,
+                                                                     monitor.config)
+        # 排队等待登录线程的时间单独统计，不计入登录耗时与熔断器的墙钟消耗
+        metrics.observe("login_queue_wait", started - queued)
+        metrics.observe("login", elapsed)
+        metrics.inc("login_succeeded" if ok else "login_failed")
+        metrics.inc("login_cpu_seconds", cpu)
+        metrics.inc("login_wall_seconds", elapsed)
+        monitor.logins += 1
+        log(f"[{monitor.name}] 登录{'成功' if ok else '失败'}，用时 {elapsed:.2f} 秒", "INFO" if ok else "WARNING")
+        # 各配置的登录在线程池中并发执行，进程 CPU 无法按配置拆分，只统计登录线程自身的 CPU
+        if monitor.breaker.record(ok, cpu, elapsed):
+            log(f"[{monitor.name}] 登录熔断器: {STATE_NAMES[monitor.breaker.state]}", "INFO" if ok else "WARNING")
+
+    async def _run_monitor(self, monitor):
+        metrics = get_metrics()
+        interval = float(monitor.config.get('check_interval', 300))
+        # 错开首次检查，避免所有配置同时探测与登录
+        await self._sleep(random.uniform(0, min(interval, 10.0)))
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            result = await self._loop.run_in_executor(self._probe_pool, monitor.probe_once)
+            metrics.observe("probe", time.perf_counter() - start)
+            if result is None:
+                metrics.inc("probe_unknown")
+                await self._sleep(interval)
+                continue
+            metrics.inc("probe_ok" if result.ok else "probe_failed")
+            monitor.checks += 1
+            if result.ok:
+                monitor.last_rtt = result.rtt
+                if monitor.online is False:
+                    log(f"[{monitor.name}] 网络已恢复 ({result.rtt:.1f} ms)", "INFO")
+            else:
+                monitor.failures += 1
+                if monitor.online is not False:
+                    log(f"[{monitor.name}] 网络异常: {result.target} {result.error}", "WARNING")
+            monitor.online = result.ok
+            if not result.ok and not self._stop.is_set():
+                kind = await self._loop.run_in_executor(self._probe_pool, monitor.classify)
+                if kind != monitor.failure_kind and kind is not None:
+                    log(f"[{monitor.name}] 断网原因: {FAILURE_NAMES[kind]}", "WARNING")
+                monitor.failure_kind = kind
+                if kind in (None, PORTAL):
+                    await self._login(monitor)
+            else:
+                monitor.failure_kind = None
+            delay = monitor.scheduler.next_delay(result.ok, interval)
+            await self._sleep(delay)
+
+    def stats(self):
+        return {
+            "profiles": len(self.monitors),
+            "online": sum(1 for m in self.monitors if m.online),
+            "checks": sum(m.checks for m in self.monitors),
+            "failures": sum(m.failures for m in self.monitors),
+            "logins": sum(m.logins for m in self.monitors),
+            "breakers_open": sum(1 for m in self.monitors if m.breaker.state != CLOSED),
+            "login_cpu_seconds": round(sum(m.breaker.cpu_seconds for m in self.monitors), 3),
+            "login_wall_seconds": round(sum(m.breaker.wall_seconds for m in self.monitors), 3),
+        }
+
+    async def run(self, duration=None):
+        """运行直到 stop() 或 duration 秒后结束"""
+        loop = self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if duration is None:
+            self._install_signals(loop)
+        else:
+            loop.call_later(duration, self._stop.set)
+        log(f"批量监控启动: {len(self.monitors)} 个配置", "INFO")
+        await asyncio.gather(*(self._run_monitor(m) for m in self.monitors))
+        for monitor in self.monitors:
+            close = getattr(monitor.probe, "close", None)
+            if close:
+                close()
+        for pool in (self._probe_pool, self._target_pool, self._login_pool):
+            pool.shutdown(wait=False)
+        log(f"批量监控已停止: {self.stats()}", "INFO")
+
+def run_fleet_main(path):
+    from config import load_config
+    from metrics import start_exporters
+    base = load_config()
+    try:
+        profiles = load_profiles(path, base)
+    except ValueError as e:
+        log(f"{path} 中的配置无效: {e}", "ERROR")
+        return 1
+    if not profiles:
+        log(f"{path} 中没有监控配置", "ERROR")
+        return 1
+    start_exporters(base)
+    runner = FleetRunner(profiles,
+                         int(base.get('fleet_probe_workers', 32)),
+                         int(base.get('fleet_login_workers', 4)))
+    try:
+        asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_fleet_main(sys.argv[1]))
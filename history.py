@@ -0,0 +1,244 @@
+"""本地 SQLite 历史记录：探测结果、断网区间与登录尝试
+
+- 数据库位于应用缓存目录（history.db），WAL 模式，读写互不阻塞
+- 记录经队列交给单独的写线程，按批次在一个事务中写入
+- 超过 history_raw_days 天的探测明细按小时聚合到 probes_hourly 后删除，
+  聚合数据保留 history_keep_days 天
+- 通过事件总线订阅 NetworkChecker 发布的事件，不侵入监控流程
+"""
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+
+import ubelt as ub
+
+from logger import log
+from events import get_event_bus, OutageStarted, LoginSucceeded, LoginFailed, MonitorStopped
+from probes import ProbeResult
+
+HISTORY_DB = os.path.join(ub.ensure_app_cache_dir('AutoConnect_chromedriver'), 'history.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    ts REAL NOT NULL, ok INTEGER NOT NULL, rtt REAL, method TEXT, target TEXT, error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_probes_ts ON probes (ts);
+CREATE TABLE IF NOT EXISTS probes_hourly (
+    hour REAL PRIMARY KEY, checks INTEGER NOT NULL, ok_count INTEGER NOT NULL,
+    rtt_sum REAL NOT NULL, rtt_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL NOT NULL, ended REAL, target TEXT, error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outages_started ON outages (started);
+CREATE TABLE IF NOT EXISTS logins (
+    ts REAL NOT NULL, engine TEXT, duration REAL, ok INTEGER NOT NULL, time_to_online REAL, detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logins_ts ON logins (ts);
+"""
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB, raw_days=7, keep_days=365, batch_size=200, flush_interval=2.0):
+        self.path = path
+        self.raw_days = float(raw_days)
+        self.keep_days = float(keep_days)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self._queue = queue.Queue()
+        self._writer = None
+        self._token = None
+        self._lock = threading.Lock()
+        self._open_outage = False
+        conn = _connect(self.path)
+        with conn:
+            conn.executescript(_SCHEMA)
+            # 上次异常退出时未结束的断网，以最后一次探测时间作为结束
+            conn.execute("UPDATE outages SET ended = COALESCE((SELECT MAX(ts) FROM probes), started) WHERE ended IS NULL")
+        conn.close()
+
+    def configure(self, config):
+        self.raw_days = float(config.get('history_raw_days', self.raw_days))
+        self.keep_days = float(config.get('history_keep_days', self.keep_days))
+
+    # --- 写入 ---
+    def start(self):
+        """启动写线程并订阅事件（重复调用无副作用）"""
+        with self._lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.stop)
+            self._token = get_event_bus().subscribe(
+                self._on_event, ProbeResult, OutageStarted, LoginSucceeded, LoginFailed, MonitorStopped)
+
+    def stop(self):
+        with self._lock:
+            if self._token is not None:
+                get_event_bus().unsubscribe(self._token)
+                self._token = None
+            writer, self._writer = self._writer, None
+        if writer:
+            self._queue.put(None)
+            writer.join(timeout=5)
+
+    def _on_event(self, event):
+        now = time.time()
+        if isinstance(event, ProbeResult):
+            self._queue.put(("INSERT INTO probes VALUES (?, ?, ?, ?, ?, ?)",
+                             (now, int(event.ok), event.rtt, event.method, event.target, event.error or None)))
+            if event.ok and self._open_outage:
+                self._open_outage = False
+                self._queue.put(("UPDATE outages SET ended = ? WHERE ended IS NULL", (now,)))
+        elif isinstance(event, OutageStarted):
+            self._open_outage = True
+            self._queue.put(("INSERT INTO outages (started, target, error) VALUES (?, ?, ?)",
+                             (event.at, event.target, event.error or None)))
+        elif isinstance(event, MonitorStopped):
+            # 停止监控后的时间不应计为断网
+            if self._open_outage:
+                self._open_outage = False
+                self._queue.put(("UPDATE outages SET ended = ? WHERE ended IS NULL", (event.at,)))
+        elif isinstance(event, LoginSucceeded):
+            self._queue.put(("INSERT INTO logins VALUES (?, ?, ?, 1, ?, ?)",
+                             (event.at, event.engine, event.duration, event.time_to_online, event.detail)))
+        elif isinstance(event, LoginFailed):
+            self._queue.put(("INSERT INTO logins VALUES (?, ?, ?, 0, NULL, ?)",
+                             (event.at, event.engine, event.duration, event.detail)))
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        next_maintenance = 0
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            try:
+                if batch:
+                    with conn:
+                        for sql, params in batch:
+                            conn.execute(sql, params)
+                if time.time() >= next_maintenance:
+                    self.downsample(conn)
+                    next_maintenance = time.time() + 3600
+            except sqlite3.Error as e:
+                log(f"写入历史记录失败: {e}", "WARNING")
+        conn.close()
+
+    def downsample(self, conn=None):
+        """把超过 raw_days 的探测明细按小时聚合，并清理超过 keep_days 的数据"""
+        own = conn is None
+        conn = conn or _connect(self.path)
+        cutoff = time.time() - self.raw_days * 86400
+        # 只聚合完整的小时，避免同一小时被拆成两次写入
+        cutoff -= cutoff % 3600
+        expire = time.time() - self.keep_days * 86400
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO probes_hourly (hour, checks, ok_count, rtt_sum, rtt_count)
+                    SELECT CAST(ts AS INTEGER) / 3600 * 3600 AS h, COUNT(*), SUM(ok), COALESCE(SUM(rtt), 0), COUNT(rtt)
+                    FROM probes WHERE ts < ? GROUP BY h
+                    ON CONFLICT(hour) DO UPDATE SET
+                        checks = checks + excluded.checks, ok_count = ok_count + excluded.ok_count,
+                        rtt_sum = rtt_sum + excluded.rtt_sum, rtt_count = rtt_count + excluded.rtt_count
+                """, (cutoff,))
+                conn.execute("DELETE FROM probes WHERE ts < ?", (cutoff,))
+                conn.execute("DELETE FROM probes_hourly WHERE hour < ?", (expire,))
+                conn.execute("DELETE FROM outages WHERE started < ?", (expire,))
+                conn.execute("DELETE FROM logins WHERE ts < ?", (expire,))
+        finally:
+            if own:
+                conn.close()
+
+    # --- 查询 ---
+    def availability(self, since):
+        """since 之后探测成功的比例（明细与小时聚合合并计算），无数据时为 None"""
+        conn = _connect(self.path)
+        try:
+            checks, ok = conn.execute("SELECT COUNT(*), COALESCE(SUM(ok), 0) FROM probes WHERE ts >= ?",
+                                      (since,)).fetchone()
+            h_checks, h_ok = conn.execute(
+                "SELECT COALESCE(SUM(checks), 0), COALESCE(SUM(ok_count), 0) FROM probes_hourly WHERE hour >= ?",
+                (since,)).fetchone()
+        finally:
+            conn.close()
+        total = checks + h_checks
+        return (ok + h_ok) / total if total else None
+
+    def outage_summary(self, since):
+        """返回 (断网次数, 累计断网秒数)，未结束的断网计到当前时间"""
+        conn = _connect(self.path)
+        try:
+            return conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(COALESCE(ended, ?) - started), 0) FROM outages WHERE started >= ?",
+                (time.time(), since)).fetchone()
+        finally:
+            conn.close()
+
+    def login_summary(self, since):
+        """返回 {"attempts", "succeeded", "median_duration", "median_time_to_online"}"""
+        conn = _connect(self.path)
+        try:
+            attempts, succeeded = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(ok), 0) FROM logins WHERE ts >= ?", (since,)).fetchone()
+
+            def median(column):
+                n = conn.execute(f"SELECT COUNT({column}) FROM logins WHERE ts >= ? AND ok = 1",
+                                 (since,)).fetchone()[0]
+                if not n:
+                    return None
+                row = conn.execute(f"SELECT {column} FROM logins WHERE ts >= ? AND ok = 1 AND {column} IS NOT NULL "
+                                   f"ORDER BY {column} LIMIT 1 OFFSET ?", (since, (n - 1) // 2)).fetchone()
+                return row[0] if row else None
+
+            return {
+                "attempts": attempts,
+                "succeeded": succeeded,
+                "median_duration": median("duration"),
+                "median_time_to_online": median("time_to_online"),
+            }
+        finally:
+            conn.close()
+
+_history = None
+_history_lock = threading.Lock()
+
+def get_history():
+    """进程内共享的历史记录存储"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore()
+        return _history
+
+def start_history(config):
+    """按配置启用历史记录，返回存储对象；未启用或打开失败时返回 None"""
+    if not config.get('history_enabled', True):
+        return None
+    try:
+        store = get_history()
+        store.configure(config)
+        store.start()
+        return store
+    except (sqlite3.Error, OSError) as e:
+        log(f"历史记录不可用: {e}", "WARNING")
+        return None
@@ -0,0 +1,71 @@
+import os
+import json
+import threading
+import ubelt as ub
+
+from logger import log
+
+dpath = ub.ensure_app_cache_dir('AutoConnect_chromedriver')
+LOCATOR_CACHE_FILE = os.path.join(dpath, "locator_cache.json")
+
+# 按钮文字定位不是 WebDriver 的原生策略，单独标记
+BUTTON_TEXT = "button_text"
+
+class LocatorCache:
+    """按 login_url 记住登录表单中命中的定位方式，持久化在 config.json 同目录
+
+    条目格式: {login_url: {"username": [by, value], "password": [...], "submit": [...]}}
+    """
+
+    def __init__(self, path=LOCATOR_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+        except Exception as e:
+            log(f"读取定位缓存失败: {e}", "WARNING")
+
+    def _save(self):
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=4, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            log(f"保存定位缓存失败: {e}", "WARNING")
+
+    def get(self, login_url):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(login_url)
+            if entry and all(entry.get(k) for k in ("username", "password", "submit")):
+                return {k: tuple(v) for k, v in entry.items()}
+            return None
+
+    def put(self, login_url, username, password, submit):
+        with self._lock:
+            self._load()
+            entry = {"username": list(username), "password": list(password), "submit": list(submit)}
+            if self._entries.get(login_url) != entry:
+                self._entries[login_url] = entry
+                self._save()
+
+    def invalidate(self, login_url):
+        with self._lock:
+            self._load()
+            if self._entries.pop(login_url, None) is not None:
+                self._save()
+                log(f"登录表单定位缓存已失效: {login_url}", "INFO")
+
+_cache = LocatorCache()
+
+def get_locator_cache():
+    return _cache
@@ -0,0 +1,249 @@
+import os
+import re
+from array import array
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QPoint, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QAbstractItemView
+
+LEVEL_COLORS = {
+    "ERROR": QColor("red"),
+    "WARNING": QColor("orange"),
+    "INFO": QColor("black"),
+    "DEBUG": QColor("gray"),
+    "CRITICAL": QColor("darkred"),
+}
+
+_LEVEL_RE = re.compile(r'\] (\w+):')
+
+def parse_level(line):
+    m = _LEVEL_RE.search(line)
+    return m.group(1) if m else "INFO"
+
+class LogIndexer(QThread):
+    """后台扫描日志文件 [0, end) 区间，建立每行起始字节偏移索引"""
+    indexed = pyqtSignal(object)
+
+    CHUNK = 1 << 20
+
+    def __init__(self, path, end, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.end = end
+
+    def run(self):
+        offsets = array('q')
+        if self.end > 0:
+            offsets.append(0)
+        try:
+            with open(self.path, 'rb') as f:
+                pos = 0
+                while pos < self.end and not self.isInterruptionRequested():
+                    chunk = f.read(min(self.CHUNK, self.end - pos))
+                    if not chunk:
+                        break
+                    i = chunk.find(b'\n')
+                    while i != -1:
+                        if pos + i + 1 < self.end:
+                            offsets.append(pos + i + 1)
+                        i = chunk.find(b'\n', i + 1)
+                    pos += len(chunk)
+        except OSError:
+            pass
+        self.indexed.emit(offsets)
+
+class LogFileModel(QAbstractListModel):
+    """日志列表模型：先只读入文件尾部，后台建好偏移索引后再按页向前加载更早的行"""
+
+    def __init__(self, path, tail_lines=500, page_size=500, max_rows=5000, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.tail_lines = tail_lines
+        self.page_size = page_size
+        self.max_rows = max_rows   # 显示行数上限，0 表示不限制
+        self._rows = []            # [(text, level)]
+        self._offsets = None       # 尾部之前各行的起始偏移
+        self._first_line = 0       # 已加载的最早一行在 _offsets 中的下标
+        self._tail_start = 0       # 尾部第一行的字节偏移
+        self._indexer = None
+
+    # --- Qt 接口 ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        text, level = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.ForegroundRole:
+            return LEVEL_COLORS.get(level, LEVEL_COLORS["INFO"])
+        return None
+
+    # --- 加载 ---
+    def load(self):
+        """读入文件尾部并启动后台索引"""
+        if self._indexer and self._indexer.isRunning():
+            self._indexer.requestInterruption()
+        self._indexer = None
+        self.beginResetModel()
+        self._rows = []
+        self._offsets = None
+        self._first_line = 0
+        self._tail_start = 0
+        if self.path and os.path.exists(self.path):
+            self._tail_start, lines = self._read_tail()
+            self._rows = [(line, parse_level(line)) for line in lines]
+        self.endResetModel()
+        if self._tail_start > 0:
+            self._indexer = LogIndexer(self.path, self._tail_start, self)
+            self._indexer.indexed.connect(self._on_indexed)
+            self._indexer.start()
+
+    def _read_tail(self):
+        """从文件末尾向前读，直到凑够 tail_lines 行；返回 (首行偏移, 行列表)"""
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            pos = size
+            data = b""
+            block = 64 * 1024
+            while pos > 0 and data.count(b'\n') <= self.tail_lines:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        start = pos
+        if pos > 0:
+            # 丢弃可能不完整的第一行
+            cut = data.find(b'\n') + 1
+            data = data[cut:]
+            start += cut
+        # 按字节切分，保证偏移计算与文件一致（Windows 下行尾为 \r\n）
+        parts = data.split(b'\n')
+        if parts and parts[-1] == b'':
+            parts.pop()
+        if len(parts) > self.tail_lines:
+            drop = parts[:len(parts) - self.tail_lines]
+            start += sum(len(p) + 1 for p in drop)
+            parts = parts[len(parts) - self.tail_lines:]
+        return start, [p.decode('utf-8', errors='replace').rstrip('\r') for p in parts]
+
+    def _on_indexed(self, offsets):
+        if self.sender() is not self._indexer:
+            return
+        self._offsets = offsets
+        self._first_line = bisect_left(offsets, self._tail_start) if len(offsets) else 0
+
+    def can_load_older(self):
+        return self._offsets is not None and self._first_line > 0
+
+    def load_older(self):
+        """在顶部插入更早的一页，返回插入的行数"""
+        if not self.can_load_older():
+            return 0
+        n = min(self.page_size, self._first_line)
+        if self.max_rows:
+            n = min(n, self.max_rows - len(self._rows))
+            if n <= 0:
+                return 0
+        begin = self._offsets[self._first_line - n]
+        end = self._offsets[self._first_line] if self._first_line < len(self._offsets) else self._tail_start
+        try:
+            if os.path.getsize(self.path) < self._tail_start:
+                # 文件已被轮转，旧的偏移索引失效
+                self._offsets = None
+                return 0
+            with open(self.path, 'rb') as f:
+                f.seek(begin)
+                chunk = f.read(end - begin)
+        except OSError:
+            return 0
+        lines = chunk.decode('utf-8', errors='replace').splitlines()
+        if not lines:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(lines) - 1)
+        self._rows[0:0] = [(line, parse_level(line)) for line in lines]
+        self.endInsertRows()
+        self._first_line -= n
+        return len(lines)
+
+    def append_line(self, text, level):
+        self.append_lines([(text, level)])
+
+    def append_lines(self, rows):
+        """批量追加，超过 max_rows 时从顶部裁掉最早的行"""
+        if not rows:
+            return
+        if self.max_rows and len(rows) > self.max_rows:
+            rows = rows[-self.max_rows:]
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+        excess = len(self._rows) - self.max_rows if self.max_rows else 0
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._rows[:excess]
+            self.endRemoveRows()
+            # 顶部已被裁剪，不再向前翻页，避免与已显示内容脱节
+            self._offsets = None
+            self._first_line = 0
+
+    def clear(self):
+        if self._indexer and self._indexer.isRunning():
+            self._indexer.requestInterruption()
+        self._indexer = None
+        self.beginResetModel()
+        self._rows = []
+        self._offsets = None
+        self._first_line = 0
+        self._tail_start = 0
+        self.endResetModel()
+
+def load_older_in_view(view, model):
+    """在顶部插入更早的一页，并让原先位于视图顶端的行保持在顶端，返回插入的行数
+
+    视图在插入后延迟布局，此时滚动条范围尚未更新，不能按 maximum() 的差值换算位置；
+    scrollTo 会先完成布局再定位。
+    """
+    first = view.indexAt(QPoint(0, 0)).row()
+    added = model.load_older()
+    if added:
+        view.scrollTo(model.index(max(first, 0) + added), QAbstractItemView.PositionAtTop)
+    return added
+
+class LogBatcher(QObject):
+    """合并日志记录：收到第一条后启动单次定时器，到时一次性交给模型，空闲时不占用定时器"""
+    flushed = pyqtSignal(int)
+
+    def __init__(self, model, interval_ms=100, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self._pending = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def set_interval(self, interval_ms):
+        self._timer.setInterval(interval_ms)
+
+    def add(self, text, level):
+        self._pending.append((text, level))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        self._timer.stop()
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        self.model.append_lines(rows)
+        self.flushed.emit(len(rows))
+
+    def clear(self):
+        self._timer.stop()
+        self._pending = []
@@ -1,21 +1,193 @@
 import os
+import gzip
+import json
+import queue
+import atexit
+import shutil
 import logging
+import threading
+import logging.handlers
+from datetime import datetime
 import ubelt as ub
 
 dpath = ub.ensure_app_cache_dir('AutoConnect_chromedriver')
 CONFIG_FILE = os.path.join(dpath, "config.json")
 LOG_FILE = os.path.join(dpath, 'auto_connect.log')
+JSON_LOG_FILE = os.path.join(dpath, 'auto_connect.jsonl')
+
+# 日志轮转默认设置，可由配置项 log_rotation / log_max_bytes / log_backup_count / log_compress 覆盖
+LOG_ROTATION = "size"          # "size" 按大小，"time" 按天
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_COMPRESS = True
+
+# 异步日志队列默认设置，可由配置项 log_queue_size / log_overflow 覆盖
+LOG_QUEUE_SIZE = 10000
+LOG_OVERFLOW = "drop_oldest"   # 队列满时: "drop_oldest" 丢弃最早的记录，"drop_new" 丢弃新记录
 
 # 全局日志记录器
 _logger = None
 _ui_log_handler = None
+_fanout = None
+_listener = None
+
+class JsonLinesFormatter(logging.Formatter):
+    """结构化日志：每行一个 JSON 对象，含时间、级别、阶段与耗时"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "phase": getattr(record, "phase", None),
+            "duration": getattr(record, "duration", None),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+class _StructuredOnlyFilter(logging.Filter):
+    """log_phase 产生的记录只写入 JSON 日志，不出现在文本日志与界面中"""
+
+    def filter(self, record):
+        return not getattr(record, "structured_only", False)
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def _log_settings(config=None):
+    """日志轮转与队列设置；未传入配置时直接读取配置文件（此时 config 模块可能尚未加载），缺少或无效的项取默认值"""
+    if config is None:
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            config = None
+    if not isinstance(config, dict):
+        config = {}
+
+    def integer(key, default, minimum):
+        try:
+            value = int(config.get(key, default))
+        except (TypeError, ValueError):
+            return default
+        return value if value >= minimum else default
+
+    rotation = str(config.get('log_rotation') or LOG_ROTATION).strip().lower()
+    overflow = str(config.get('log_overflow') or LOG_OVERFLOW).strip().lower()
+    return {
+        "rotation": rotation if rotation in ("size", "time") else LOG_ROTATION,
+        "max_bytes": integer('log_max_bytes', LOG_MAX_BYTES, 1),
+        "backup_count": integer('log_backup_count', LOG_BACKUP_COUNT, 0),
+        "compress": bool(config.get('log_compress', LOG_COMPRESS)),
+        "queue_size": integer('log_queue_size', LOG_QUEUE_SIZE, 1),
+        "overflow": overflow if overflow in ("drop_oldest", "drop_new") else LOG_OVERFLOW,
+    }
+
+def _rotating_handler(path, settings):
+    if settings["rotation"] == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when='midnight', backupCount=settings["backup_count"], encoding='utf-8')
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=settings["max_bytes"], backupCount=settings["backup_count"], encoding='utf-8')
+    if settings["compress"]:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """非阻塞入队：调用线程只做格式化与入队，队列满时按 overflow 策略丢弃并计数"""
+
+    def __init__(self, q, overflow=LOG_OVERFLOW):
+        super().__init__(q)
+        self.overflow = overflow
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        with self._drop_lock:
+            self.dropped += 1
+            if self.overflow == "drop_oldest":
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
 
-def setup_logger():
-    """设置日志系统"""
-    global _logger
+class _FanoutHandler(logging.Handler):
+    """运行在监听线程中，把记录分发给文件、控制台、JSON 与可替换的 UI 处理器"""
+
+    def __init__(self, handlers):
+        super().__init__()
+        self._handlers = list(handlers)
+        self._ui = None
+        self._swap_lock = threading.Lock()
+        self._reported_drops = 0
+
+    def set_ui(self, handler):
+        with self._swap_lock:
+            self._ui = handler
+
+    def _targets(self):
+        with self._swap_lock:
+            return self._handlers + ([self._ui] if self._ui else [])
+
+    def handle(self, record):
+        self._report_drops()
+        for handler in self._targets():
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def _report_drops(self):
+        dropped = dropped_records()
+        if dropped > self._reported_drops:
+            missed = dropped - self._reported_drops
+            self._reported_drops = dropped
+            notice = logging.LogRecord(
+                'AutoConnectLogger', logging.WARNING, __file__, 0,
+                f"日志队列已满，丢弃了 {missed} 条日志（累计 {dropped} 条）", None, None)
+            for handler in self._targets():
+                handler.handle(notice)
+
+    def flush(self):
+        for handler in self._targets():
+            handler.flush()
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # 队列满时也要等到结束标记入队，保证剩余记录全部写出
+        self.queue.put(self._sentinel)
+
+def dropped_records():
+    """因日志队列溢出而丢弃的记录数"""
+    if _logger is None:
+        return 0
+    return sum(getattr(h, "dropped", 0) for h in _logger.handlers)
+
+def shutdown_logger():
+    """停止监听线程，写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _fanout is not None:
+        _fanout.flush()
+
+def setup_logger(config=None):
+    """设置日志系统；轮转与队列设置取自 config（未传入时读取配置文件），只在首次调用时生效"""
+    global _logger, _fanout, _listener
     if _logger is not None:
         return _logger
-    
 
     _logger = logging.getLogger('AutoConnectLogger')
     _logger.setLevel(logging.INFO)
@@ -25,15 +197,27 @@ def setup_logger():
             '[%(asctime)s] %(levelname)s: %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
+        text_only = _StructuredOnlyFilter()
+        settings = _log_settings(config)
 
-        file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
+        file_handler = _rotating_handler(LOG_FILE, settings)
         file_handler.setFormatter(formatter)
+        file_handler.addFilter(text_only)
 
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
+        console_handler.addFilter(text_only)
+
+        json_handler = _rotating_handler(JSON_LOG_FILE, settings)
+        json_handler.setFormatter(JsonLinesFormatter())
 
-        _logger.addHandler(file_handler)
-        _logger.addHandler(console_handler)
+        # 实际写入在监听线程中完成，调用 log() 的线程不会被慢速磁盘或控制台阻塞
+        _fanout = _FanoutHandler([file_handler, console_handler, json_handler])
+        records = queue.Queue(maxsize=settings["queue_size"])
+        _listener = _Listener(records, _fanout)
+        _listener.start()
+        atexit.register(shutdown_logger)
+        _logger.addHandler(_BoundedQueueHandler(records, settings["overflow"]))
 
     return _logger
 
@@ -43,12 +227,6 @@ def set_ui_handler(ui_handler):
     if _logger is None:
         setup_logger()
 
-    if _ui_log_handler:
-        try:
-            _logger.removeHandler(_ui_log_handler)
-        except Exception:
-            pass
-
     _ui_log_handler = ui_handler
     if _ui_log_handler:
         formatter = logging.Formatter(
@@ -57,24 +235,34 @@ def set_ui_handler(ui_handler):
         )
         _ui_log_handler.setFormatter(formatter)
         _ui_log_handler.setLevel(logging.INFO)
-        _logger.addHandler(_ui_log_handler)
+        _ui_log_handler.addFilter(_StructuredOnlyFilter())
+    # 只替换监听线程中的分发目标，队列中尚未处理的记录会交给新的处理器
+    if _fanout is not None:
+        _fanout.set_ui(_ui_log_handler)
 
-def log(message, level="INFO"):
-    """记录日志"""
+def log(message, level="INFO", phase=None, duration=None):
+    """记录日志；phase/duration 会写入 JSON 日志的对应字段"""
     if _logger is None:
         setup_logger()
 
+    extra = {"phase": phase, "duration": duration}
     level = level.upper()
     if level == "INFO":
-        _logger.info(message)
+        _logger.info(message, extra=extra)
     elif level == "WARNING":
-        _logger.warning(message)
+        _logger.warning(message, extra=extra)
     elif level == "ERROR":
-        _logger.error(message)
+        _logger.error(message, extra=extra)
     elif level == "DEBUG":
-        _logger.debug(message)
+        _logger.debug(message, extra=extra)
     else:
-        _logger.info(message)
+        _logger.info(message, extra=extra)
+
+def log_phase(phase, duration, message=""):
+    """只向 JSON 日志写入一条阶段耗时记录"""
+    if _logger is None:
+        setup_logger()
+    _logger.info(message or phase, extra={"phase": phase, "duration": round(duration, 6), "structured_only": True})
 
 def get_logger():
     """获取日志记录器实例"""
@@ -12,8 +12,17 @@ def main():
     parser.add_argument('--gui', action='store_true', help='启动GUI界面')
     parser.add_argument('--auto', action='store_true', help='命令行自动监控')
     parser.add_argument('--tray', action='store_true', help='仅托盘模式')
+    parser.add_argument('--daemon', action='store_true', help='无界面守护进程模式（asyncio，不加载 PyQt5）')
+    parser.add_argument('--fleet', metavar='PROFILES', help='批量监控模式：按 JSON 文件中的多个配置同时监控')
+    parser.add_argument('--startup-profile', action='store_true', help='分析托盘模式启动耗时（-X importtime）')
+    parser.add_argument('--startup-budget', type=float, default=None, help='启动到托盘图标的时间预算（秒），超出时返回退出码 1；提前导入延迟加载的模块时返回 3')
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    if args.startup_profile:
+        from startup_profile import run_startup_profile
+        sys.exit(run_startup_profile(args.startup_budget))
+
     setup_logger()
     log("程序启动", "INFO")
 
@@ -22,12 +31,23 @@ def main():
         from ui import start_ui
         sys.exit(start_ui())
 
+    if args.fleet:
+        from fleet import run_fleet_main
+        sys.exit(run_fleet_main(args.fleet))
+
+    if args.daemon:
+        from daemon import run_daemon_main
+        sys.exit(run_daemon_main())
+
     if args.auto:
         # ...existing code...
-        from config import load_config
+        from config import load_config, get_config_store
         from network_checker import NetworkChecker
         cfg = load_config()
         nc = NetworkChecker(cfg)
+        store = get_config_store()
+        store.subscribe(lambda new_cfg, _changed: setattr(nc, 'config', new_cfg))
+        store.start_watcher()
         nc.start_checking()
         return
 
@@ -35,6 +55,14 @@ def main():
     log("启动托盘模式", "INFO")
     from tray_icon import start_tray_only
     app, tray_manager = start_tray_only()
+    if args.startup_probe:
+        # 供 --startup-profile 测量：托盘图标就绪后立即退出，没有托盘图标时不输出就绪标记
+        if not (app and tray_manager and tray_manager.tray_icon):
+            sys.exit(1)
+        import time
+        from startup_profile import READY_MARKER
+        print(f"{READY_MARKER} {time.time()}", flush=True)
+        sys.exit(0)
     if app and tray_manager:
         sys.exit(app.exec_())
     else:
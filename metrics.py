@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from logger import log, dropped_records
+
+# 秒为单位的直方图桶上界
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Histogram:
+    """累计桶计数（Prometheus 格式）+ 最近 window 个样本（计算滚动分位数）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def snapshot(self):
+        return {
+            "count": self.total,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "last": self.recent[-1] if self.recent else None,
+        }
+
+class MetricsRegistry:
+    """按阶段记录耗时与计数器，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            hist = self.histograms.get(phase)
+            if hist is None:
+                hist = self.histograms[phase] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def _counters(self):
+        counters = dict(self.counters)
+        counters["log_records_dropped"] = dropped_records()
+        return counters
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "phases": {k: h.snapshot() for k, h in self.histograms.items()},
+                "counters": self._counters(),
+            }
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP autoconnect_phase_seconds Duration of monitor/login phases.",
+            "# TYPE autoconnect_phase_seconds histogram",
+        ]
+        with self._lock:
+            for phase, hist in sorted(self.histograms.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'autoconnect_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+                lines.append(f'autoconnect_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {hist.total}')
+                lines.append(f'autoconnect_phase_seconds_sum{{phase="{phase}"}} {hist.sum}')
+                lines.append(f'autoconnect_phase_seconds_count{{phase="{phase}"}} {hist.total}')
+            lines.append("# HELP autoconnect_phase_recent_seconds Rolling quantiles over recent samples.")
+            lines.append("# TYPE autoconnect_phase_recent_seconds gauge")
+            for phase, hist in sorted(self.histograms.items()):
+                for q in (0.5, 0.95, 0.99):
+                    value = hist.quantile(q)
+                    if value is not None:
+                        lines.append(f'autoconnect_phase_recent_seconds{{phase="{phase}",quantile="{q}"}} {value}')
+            lines.append("# HELP autoconnect_events_total Event counters.")
+            lines.append("# TYPE autoconnect_events_total counter")
+            for name, value in sorted(self._counters().items()):
+                lines.append(f'autoconnect_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+_metrics = MetricsRegistry()
+_http_server = None
+_json_thread = None
+
+def get_metrics():
+    """进程内共享的指标注册表"""
+    return _metrics
+
+def _start_http_exporter(port):
+    global _http_server
+    registry = _metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] in ("/metrics", "/"):
+                body = registry.render_prometheus().encode("utf-8")
+                ctype = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body = json.dumps(registry.to_dict()).encode("utf-8")
+                ctype = "application/json"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    # 仅监听本机
+    _http_server = ThreadingHTTPServer(("127.0.0.1", int(port)), Handler)
+    _http_server.daemon_threads = True
+    threading.Thread(target=_http_server.serve_forever, name="metrics-http", daemon=True).start()
+    log(f"指标导出已启动: http://127.0.0.1:{port}/metrics", "INFO")
+
+def _start_json_exporter(path, interval):
+    global _json_thread
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                tmp = path + ".tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(_metrics.to_dict(), f, indent=2)
+                os.replace(tmp, path)
+            except Exception as e:
+                log(f"写入指标文件失败: {e}", "WARNING")
+
+    _json_thread = threading.Thread(target=loop, name="metrics-json", daemon=True)
+    _json_thread.start()
+    log(f"指标将每 {interval} 秒写入 {path}", "INFO")
+
+def start_exporters(config):
+    """按配置启动 Prometheus 文本端口和/或 JSON 文件导出（重复调用无副作用）"""
+    port = int(config.get('metrics_port') or 0)
+    if port and _http_server is None:
+        try:
+            _start_http_exporter(port)
+        except Exception as e:
+            log(f"指标导出端口启动失败: {e}", "WARNING")
+    path = (config.get('metrics_json_path') or "").strip()
+    if path and _json_thread is None:
+        _start_json_exporter(path, float(config.get('metrics_json_interval') or 60))
@@ -1,34 +1,314 @@
 import os
 import time
-import subprocess
-import socket
-from urllib.parse import urlparse
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from chromedriver_manager import check_chrome_chromedriver_matched
+from chromedriver_manager import check_chrome_chromedriver_matched, invalidate_match_cache
+from srun_login import http_login, http_logout
+from scheduler import AdaptiveScheduler
+from dns_cache import get_resolver
+from metrics import get_metrics, start_exporters
+from history import start_history
+from locator_cache import get_locator_cache, BUTTON_TEXT
+from events import (get_event_bus, MonitorStarted, MonitorStopped, OutageStarted, FailureClassified,
+                    LoginAttempt, LoginSucceeded, LoginFailed, BreakerUpdated)
+from breaker import LoginBreaker, STATE_NAMES
+from renewal import SessionRenewer
+from classifier import FailureClassifier, FAILURE_NAMES, PORTAL
+from probes import make_multi_probe, split_targets, MultiProbe, ProbeUnavailable
 
-from logger import log
+from logger import log, log_phase
+from platform_utils import chromedriver_executable, hide_service_window, process_tree_cpu_seconds
+
+DEFAULT_SUCCESS_SELECTORS = ["#logout", "#user_name", "#success", ".success"]
+
+_SUCCESS_ELEMENT_JS = r"""
+var sels = arguments[0];
+for (var i = 0; i < sels.length; i++) {
+    var el = document.querySelector(sels[i]);
+    if (el && el.offsetParent !== null) return sels[i];
+}
+return null;
+"""
+
+@dataclass
+class LoginResult:
+    """一次登录的结果；可直接当作布尔值使用"""
+    ok: bool
+    engine: str = ""
+    duration: float = 0.0
+    time_to_online: float = None
+    detail: str = ""
+
+    def __bool__(self):
+        return bool(self.ok)
+
+LOGOUT_SELECTORS = ["#logout", "#btn-logout", ".logout"]
+CONFIRM_TEXTS = ["确定", "确认", "注销", "OK"]
+
+# 点击门户页面上的注销按钮，或注销确认框中的确定按钮；返回是否点击
+_CLICK_JS = r"""
+var sels = arguments[0], texts = arguments[1];
+for (var i = 0; i < sels.length; i++) {
+    var el = document.querySelector(sels[i]);
+    if (el && el.offsetParent !== null) { el.click(); return true; }
+}
+var bs = document.querySelectorAll('button, a, .layui-layer-btn0');
+for (var j = 0; j < bs.length; j++) {
+    var t = (bs[j].innerText || bs[j].textContent || '').trim();
+    if (texts.indexOf(t) >= 0 && bs[j].offsetParent !== null) { bs[j].click(); return true; }
+}
+return false;
+"""
+
+# 页面上出现可见的用户名输入框即视为已注销
+_LOGGED_OUT_JS = r"""
+var names = arguments[0];
+for (var i = 0; i < names.length; i++) {
+    var el = document.getElementsByName(names[i])[0] || document.getElementById(names[i]);
+    if (el && el.offsetParent !== null) return true;
+}
+return false;
+"""
+
+USERNAME_CANDIDATES = ["username", "userName", "uname", "loginName", "account"]
+PASSWORD_CANDIDATES = ["password", "pwd", "pass", "passwd"]
+SUBMIT_CANDIDATES = ["login", "submit", "Log In", "登录", "登 录"]
+
+# 在页面内一次完成：按缓存或候选名定位 -> 赋值并触发事件 -> 异步点击提交
+# 返回命中的定位方式（格式与 LocatorCache 相同）与页面内定位、填写耗时 fill_ms
+_FILL_FORM_JS = r"""
+var user = arguments[0], pwd = arguments[1], cands = arguments[2], cached = arguments[3];
+var t0 = performance.now();
+function buttonByText(texts) {
+    var bs = document.getElementsByTagName('button');
+    for (var i = 0; i < bs.length; i++) {
+        var t = (bs[i].innerText || bs[i].textContent || '').trim();
+        if (texts.indexOf(t) >= 0) return [bs[i], ['button_text', t]];
+    }
+    return null;
+}
+function byLocator(loc) {
+    var el = null;
+    if (loc[0] === 'name') el = document.getElementsByName(loc[1])[0];
+    else if (loc[0] === 'id') el = document.getElementById(loc[1]);
+    else if (loc[0] === 'button_text') return buttonByText([loc[1]]);
+    return el ? [el, loc] : null;
+}
+function find(names, withText) {
+    for (var i = 0; i < names.length; i++) {
+        var el = document.getElementsByName(names[i])[0];
+        if (el) return [el, ['name', names[i]]];
+        el = document.getElementById(names[i]);
+        if (el) return [el, ['id', names[i]]];
+    }
+    return withText ? buttonByText(names) : null;
+}
+function setValue(el, value) {
+    el.focus();
+    var proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    var desc = Object.getOwnPropertyDescriptor(proto, 'value');
+    if (desc && desc.set) desc.set.call(el, value); else el.value = value;
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.dispatchEvent(new KeyboardEvent('keyup', {bubbles: true}));
+    el.blur();
+}
+var u = null, p = null, s = null, fromCache = false;
+if (cached) {
+    u = byLocator(cached.username); p = byLocator(cached.password); s = byLocator(cached.submit);
+    fromCache = !!(u && p && s);
+}
+if (!fromCache) {
+    u = find(cands.username, false); p = find(cands.password, false); s = find(cands.submit, true);
+}
+var result = {
+    username: u ? u[1] : null, password: p ? p[1] : null, submit: s ? s[1] : null,
+    from_cache: fromCache, filled: false, submitted: false
+};
+if (!u || !p) return result;
+setValue(u[0], user);
+setValue(p[0], pwd);
+result.filled = true;
+result.fill_ms = performance.now() - t0;
+if (s) {
+    // 延后点击，避免页面跳转打断本次脚本返回
+    var btn = s[0];
+    setTimeout(function () { btn.click(); }, 0);
+    result.submitted = true;
+}
+return result;
+"""
 
 class NetworkChecker:
     def __init__(self, config):
-        self.config = config
+        self.scheduler = AdaptiveScheduler()
+        self.breaker = LoginBreaker()
+        self._config = config
         self.driver = None
         self.is_running = False
         self.attempt_count = 0
+        self.last_probe = None
+        self.phase_times = {}
+        self._online_at = None
+        self._completion_reason = None
+        self.locator_cache = get_locator_cache()
+        self._probe = None
+        self._probe_key = None
+        self._online = None
+        self._closed_browser_cpu = 0.0   # 已关闭的浏览器会话消耗的 CPU 秒数
+        self.events = get_event_bus()
+        # 监控循环的登录与会话续期可能同时发生，共用浏览器与门户会话，需串行执行
+        self._login_lock = threading.Lock()
+        self.renewer = SessionRenewer(lambda: self.config, lambda: self.scheduler.wake("session"), self.events,
+                                      self.renew_session)
+
+    @property
+    def config(self):
+        return self._config
+
+    @config.setter
+    def config(self, value):
+        """替换配置并立即唤醒监控循环，使新配置马上生效"""
+        self._config = value
+        if self.is_running:
+            self._sync_renewer()
+        self.scheduler.wake("config")
+
+    def _sync_renewer(self):
+        """按 session_renewal 启动或停止会话续期线程"""
+        enabled = bool(self.config.get('session_renewal', False))
+        if enabled and not self.renewer.running:
+            self.renewer.start()
+        elif not enabled and self.renewer.running:
+            self.renewer.stop()
+            log("会话主动续期已停用", "INFO")
+
+    @contextmanager
+    def _phase(self, name):
+        """记录一个阶段的耗时到 phase_times 与全局指标"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_phase(name, time.perf_counter() - start)
+
+    def _record_phase(self, name, elapsed):
+        self.phase_times[name] = elapsed
+        get_metrics().observe(name, elapsed)
+        log_phase(name, elapsed)
+
+    def _log_phases(self):
+        names = {
+            "driver_init": "驱动启动", "page_load": "页面加载", "field_fill": "填写表单",
+            "submit": "提交", "verification": "等待确认", "teardown": "清理",
+        }
+        parts = [f"{names.get(k, k)} {v:.2f}s" for k, v in self.phase_times.items()]
+        if parts:
+            log("登录阶段耗时: " + ", ".join(parts), "INFO")
+
+    def _login_engine(self):
+        """当前配置的登录方式（http / selenium）"""
+        return (self.config.get('login_engine') or "http").strip().lower()
+
+    def _needs_browser(self):
+        """当前配置下登录是否可能用到浏览器"""
+        return self._login_engine() != "http" or bool(self.config.get('login_fallback_selenium', True))
+
+    def _warm_driver_enabled(self):
+        return bool(self.config.get('warm_driver', False))
+
+    def _driver_alive(self):
+        """检查已有浏览器会话是否仍可用"""
+        if self.driver is None:
+            return False
+        try:
+            _ = self.driver.window_handles
+            _ = self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _driver_tree_cpu(self):
+        """当前浏览器会话（chromedriver 及其启动的 Chrome 进程树）的 CPU 秒数，没有会话时为 0"""
+        try:
+            pid = self.driver.service.process.pid
+        except Exception:
+            return 0.0
+        return process_tree_cpu_seconds(pid) or 0.0
+
+    def _before_driver_quit(self):
+        """关闭浏览器前采样其进程树的 CPU，进程退出后就无法再统计"""
+        if self.driver is not None:
+            self._closed_browser_cpu += self._driver_tree_cpu()
+
+    def browser_cpu_seconds(self):
+        """本检查器启动过的浏览器会话累计 CPU 秒数（不含其它配置或其它线程）"""
+        return self._closed_browser_cpu + self._driver_tree_cpu()
+
+    def _quit_driver(self):
+        try:
+            if self.driver:
+                self._before_driver_quit()
+                self.driver.quit()
+        except Exception:
+            pass
+        finally:
+            self.driver = None
+
+    def ensure_driver(self):
+        """获取可用的浏览器；热驱动模式下复用会话，会话失效时自动重建"""
+        if self.driver is not None and not self._driver_alive():
+            log("浏览器会话已失效，正在重建", "WARNING")
+            self._quit_driver()
+        if self.driver is not None:
+            return True
+        start = time.perf_counter()
+        with self._phase("driver_init"):
+            ok = self.initialize_driver()
+        if ok:
+            log(f"浏览器冷启动耗时 {time.perf_counter() - start:.2f} 秒", "INFO")
+        return ok
+
+    def park_driver(self):
+        """登录结束后将浏览器停在空白页，供下次登录复用"""
+        try:
+            # 先清除门户的 Cookie 再离开页面：delete_all_cookies 只作用于当前页面所在的域
+            try:
+                self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                try:
+                    self.driver.delete_all_cookies()
+                except Exception:
+                    pass
+            self.driver.get("about:blank")
+            log("浏览器已停放在空白页（热驱动模式）", "INFO")
+        except Exception as e:
+            log(f"停放浏览器失败，将关闭会话: {e}", "WARNING")
+            self._quit_driver()
+
+    def _note_version_error(self, error):
+        """浏览器与驱动版本不符时使版本缓存失效，下一轮重新检查"""
+        text = str(error).lower()
+        if "version" in text and ("chrome" in text or "session not created" in text):
+            log("检测到浏览器版本错误，将重新检查 ChromeDriver 版本", "WARNING")
+            invalidate_match_cache()
 
     def initialize_driver(self):
         """初始化 ChromeDriver - 完全隐藏所有窗口"""
         if self.driver:
             return True
         try:
-            driver_path = (self.config.get('chromedriver_path') or "").strip()
-            driver_path = driver_path + "\\chromedriver.exe"
+            driver_path = chromedriver_executable(self.config.get('chromedriver_path'))
             if not driver_path or not os.path.isfile(driver_path):
                 log("chromedriver_path 未配置或文件不存在", "ERROR")
                 return False
 
+            # selenium 体积较大，只在真正需要浏览器时才导入
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+
             options = webdriver.ChromeOptions()
             
             # 无头模式
@@ -51,8 +331,8 @@ class NetworkChecker:
             # 关键：配置 Service 来隐藏命令行窗口
             service = Service(driver_path)
             
-            # 设置服务参数来隐藏窗口
-            service.creationflags = subprocess.CREATE_NO_WINDOW  # 这行是关键！
+            # 设置服务参数来隐藏窗口（仅 Windows）
+            hide_service_window(service)
             
             self.driver = webdriver.Chrome(service=service, options=options)
 
@@ -77,147 +357,329 @@ class NetworkChecker:
             
         except Exception as e:
             log(f"初始化 ChromeDriver 时出错: {e}", "ERROR")
+            self._note_version_error(e)
             self.driver = None
             return False
 
-    def _extract_host(self, test_url: str) -> str:
-        if not test_url:
-            return "kimi.moonshot.cn"
-        if "://" in test_url:
-            host = urlparse(test_url).hostname
-            return host or test_url
-        return test_url.split("/")[0]
+    def _get_probe(self):
+        """按当前配置获取（并缓存）探测器，配置变更时重建"""
+        targets = tuple(split_targets(self.config.get('test_url', 'https://kimi.moonshot.cn')))
+        method = self.config.get('probe_method', 'auto')
+        timeout = self.config.get('probe_timeout') or None
+        http_timeout = self.config.get('http_probe_timeout') or None
+        quorum = self.config.get('probe_quorum', 1)
+        if str(quorum).strip().lower() == "first":
+            quorum = 1
+        deadline = self.config.get('probe_deadline') or None
+        source = self.config.get('source_address') or None
+        key = (targets, method, timeout, http_timeout, quorum, deadline, source)
+        if self._probe_key != key:
+            if isinstance(self._probe, MultiProbe):
+                self._probe.close()
+            self._probe = make_multi_probe(
+                list(targets), method,
+                float(timeout) if timeout else None,
+                int(quorum),
+                float(deadline) if deadline else None,
+                source,
+                http_timeout=float(http_timeout) if http_timeout else None,
+            )
+            self._probe_key = key
+        return self._probe
 
     def check_network(self):
-        """使用 ping 检查网络连通性"""
-        test_url = self.config.get('test_url', 'https://kimi.moonshot.cn')
-        host = self._extract_host(test_url)
+        """在进程内探测网络连通性（ICMP / TCP / HTTP）
+
+        返回 True / False；探测方式不可用或检查本身出错时无法判断，返回 None。
+        """
         try:
+            get_resolver().configure(self.config)
+            probe = self._get_probe()
             try:
-                socket.gethostbyname(host)
-            except Exception as e:
-                log(f"DNS 解析失败: {host} {e}", "WARNING")
-
-            proc = subprocess.run(
-                ["ping", "-n", "1", "-w", "1500", host],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="ignore",
-                creationflags=subprocess.CREATE_NO_WINDOW  # 隐藏命令行窗口
-            )
-            ok = proc.returncode == 0
-            if ok:
-                log(f"网络正常: {host}", "INFO")
+                with self._phase("probe"):
+                    result = probe()
+            except ProbeUnavailable as e:
+                log(f"探测方式 {probe.method} 不可用，无法判断网络状态: {e}", "WARNING")
+                get_metrics().inc("probe_unknown")
+                return None
+            self.last_probe = result
+            get_metrics().inc("probe_ok" if result.ok else "probe_failed")
+            self.events.publish(result)
+            if not result.ok and self._online is not False:
+                self.events.publish(OutageStarted(result.target, result.error))
+            self._online = result.ok
+            get_resolver().set_online(result.ok)
+            if isinstance(probe, MultiProbe):
+                for r in probe.last_results:
+                    rtt = f"{r.rtt:.1f} ms" if r.ok else r.error
+                    log(f"  探测 {r.target} ({r.method}): {rtt}", "DEBUG")
+            if result.ok:
+                log(f"网络正常: {result.target} ({result.method} {result.rtt:.1f} ms)", "INFO")
             else:
-                log(f"网络异常，ping 失败: {host}", "WARNING")
-            return ok
+                log(f"网络异常，{result.method} 探测失败: {result.target} {result.error}", "WARNING")
+                log(f"DNS 缓存统计: {get_resolver().stats()}", "INFO")
+            return result.ok
         except Exception as e:
             log(f"执行网络检查失败: {e}", "ERROR")
-            return False
+            get_metrics().inc("probe_unknown")
+            return None
 
-    def login(self):
-        """简单登录尝试"""
-        try:
-            print("执行登录流程...")
-            if self.driver is None and not self.initialize_driver():
-                log("无法初始化浏览器，跳过登录", "ERROR")
-                return False
+    def login(self, attempt=None):
+        """按 login_engine 选择登录方式，HTTP 登录被拒绝（或请求失败）时回退到浏览器
 
-            user_name = self.config.get('username', '')
-            pwd = self.config.get('password', '')
-            login_url = self.config.get('login_url', 'https://gw.buaa.edu.cn/')
+        attempt 为本次断网中的第几次重连，会话续期等不属于断网重连的登录为 None。
+        返回 LoginResult，其中 time_to_online 为从开始登录到确认在线的秒数。
+        """
+        metrics = get_metrics()
+        metrics.inc("login_attempt")
+        engine = self._login_engine()
+        self.events.publish(LoginAttempt(attempt, engine))
+        start = time.perf_counter()
+        engine, ok, detail = self._login_with_engine(engine, start)
+        result = LoginResult(ok, engine, time.perf_counter() - start, self._online_at, detail)
+        if ok:
+            self.events.publish(LoginSucceeded(engine, result.duration, result.time_to_online, detail))
+        else:
+            self.events.publish(LoginFailed(engine, result.duration, detail))
+        metrics.observe("login", result.duration)
+        metrics.inc("login_succeeded" if ok else "login_failed")
+        if ok and result.time_to_online is not None:
+            metrics.observe("time_to_online", result.time_to_online)
+            log(f"登录成功，{result.time_to_online:.2f} 秒后恢复在线（{engine}，{detail}）", "INFO",
+                phase="login", duration=result.time_to_online)
+        elif not ok:
+            log(f"登录失败（{engine}）: {detail}", "WARNING", phase="login", duration=result.duration)
+        return result
 
-            if not user_name or not pwd:
-                log("用户名或密码缺失，跳过登录", "WARNING")
-                return False
+    def _login_with_engine(self, engine, start):
+        """以 engine 方式登录，返回 (实际使用的方式, 是否成功, 描述)"""
+        self._online_at = None
+        if engine == "http":
+            with self._phase("http_login"):
+                ok = http_login(self.config)
+            if ok:
+                with self._phase("verification"):
+                    reason = self.wait_for_login_completion(start)
+                if reason:
+                    return "http", True, reason
+                # 门户已接受登录，浏览器再提交一次也不会更快恢复，不回退
+                log("HTTP 登录已提交，但在期限内未检测到网络恢复", "WARNING")
+                return "http", False, "已提交但未检测到在线"
+            if not self.config.get('login_fallback_selenium', True):
+                return "http", False, "HTTP 登录失败"
+            log("HTTP 登录失败，回退到浏览器登录", "WARNING")
+        ok = self.login_selenium(start)
+        return "selenium", ok, self._completion_reason or "浏览器登录失败"
 
-            log(f"尝试登录: {login_url}", "INFO")
-            self.driver.get(login_url)
-            # time.sleep(2)
+    def wait_for_login_completion(self, start, start_url=None):
+        """提交后主动检测登录完成，返回判定依据（'probe' / 'url' / 'element'），超时返回 None
 
-            username_candidates = ["username", "userName", "uname", "loginName", "account"]
-            password_candidates = ["password", "pwd", "pass", "passwd"]
-            submit_candidates = ["login", "submit", "Log In", "登录", "登 录"]
+        浏览器方式下同时观察页面跳转和成功元素；两种方式都会轮询探测层。
+        """
+        deadline = time.monotonic() + float(self.config.get('login_timeout', 10))
+        poll = float(self.config.get('login_poll_interval', 0.2))
+        keyword = self.config.get('login_success_url_keyword', 'success')
+        selectors = self.config.get('login_success_selectors') or DEFAULT_SUCCESS_SELECTORS
+        probe = self._get_probe()
+        next_probe = 0.0
+        reason = None
+        while reason is None and time.monotonic() < deadline:
+            if start_url and self.driver is not None:
+                try:
+                    url = self.driver.current_url
+                    if url != start_url and (not keyword or keyword in url):
+                        reason = "url"
+                    elif self.driver.execute_script(_SUCCESS_ELEMENT_JS, selectors):
+                        reason = "element"
+                except Exception:
+                    pass
+            if reason is None and time.monotonic() >= next_probe:
+                try:
+                    if probe().ok:
+                        reason = "probe"
+                except ProbeUnavailable:
+                    pass
+                next_probe = time.monotonic() + max(poll, 0.5)
+            if reason is None:
+                time.sleep(poll)
+        if reason:
+            self._online_at = time.perf_counter() - start
+        return reason
 
-            def try_fill(name_list, value):
-                for name in name_list:
-                    # by name
-                    try:
-                        el = self.driver.find_element(By.NAME, name)
-                        el.clear()
-                        el.send_keys(value)
-                        return True
-                    except Exception:
-                        pass
-                    # by id
-                    try:
-                        el = self.driver.find_element(By.ID, name)
-                        el.clear()
-                        el.send_keys(value)
-                        return True
-                    except Exception:
-                        pass
-                return False
+    def fill_form_scripted(self, login_url, user_name, pwd):
+        """单次 execute_script 完成定位、赋值、触发 input/change 事件与提交
 
-            def try_click(candidates):
-                # id/name
-                for text in candidates:
-                    # name
+        点击了提交按钮时返回 True；脚本失败、未找到输入框或提交按钮时返回 None，由逐元素方式兜底。
+        阶段耗时与逐元素方式对应：field_fill 为页面内定位与填写的耗时（脚本返回的 fill_ms），
+        submit 为本次调用的其余部分（WebDriver 往返与安排点击）。
+        """
+        cached = self.locator_cache.get(login_url)
+        start = time.perf_counter()
+        try:
+            result = self.driver.execute_script(
+                _FILL_FORM_JS, user_name, pwd,
+                {"username": USERNAME_CANDIDATES, "password": PASSWORD_CANDIDATES, "submit": SUBMIT_CANDIDATES},
+                {k: list(v) for k, v in cached.items()} if cached else None,
+            )
+        except Exception as e:
+            log(f"脚本填表失败，改用逐元素方式: {e}", "WARNING")
+            return None
+        elapsed = time.perf_counter() - start
+        if not result:
+            return None
+        if result.get("filled"):
+            fill = min(elapsed, float(result.get("fill_ms") or 0) / 1000)
+            self._record_phase("field_fill", fill)
+            if result.get("submitted"):
+                self._record_phase("submit", elapsed - fill)
+        if cached and not result.get("from_cache"):
+            self.locator_cache.invalidate(login_url)
+        if not result.get("filled"):
+            return None
+        if result.get("submitted"):
+            log(f"登录提交已点击（脚本填表，定位: {result['username']} {result['password']} {result['submit']}）", "INFO")
+            self.locator_cache.put(login_url, result["username"], result["password"], result["submit"])
+            return True
+        log("脚本填表未找到登录提交按钮，改用逐元素方式", "WARNING")
+        return None
+
+    def fill_form_elements(self, login_url, user_name, pwd):
+        """逐元素填写并提交表单；表单填写失败或未找到提交按钮时返回 False"""
+        from selenium.webdriver.common.by import By
+
+        def fill(el, value):
+            el.clear()
+            el.send_keys(value)
+
+        def try_fill(name_list, value):
+            for name in name_list:
+                for by in (By.NAME, By.ID):
                     try:
-                        el = self.driver.find_element(By.NAME, text)
-                        el.click()
-                        return True
+                        fill(self.driver.find_element(by, name), value)
+                        return (by, name)
                     except Exception:
                         pass
-                    # id
+            return None
+
+        def try_click(candidates):
+            # id/name
+            for text in candidates:
+                for by in (By.NAME, By.ID):
                     try:
-                        el = self.driver.find_element(By.ID, text)
-                        el.click()
-                        return True
+                        self.driver.find_element(by, text).click()
+                        return (by, text)
                     except Exception:
                         pass
-                # 按钮文字
-                try:
-                    buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                    for b in buttons:
-                        if b.text.strip() in candidates:
-                            b.click()
-                            return True
-                except Exception:
-                    pass
+            # 按钮文字
+            try:
+                buttons = self.driver.find_elements(By.TAG_NAME, "button")
+                for b in buttons:
+                    text = b.text.strip()
+                    if text in candidates:
+                        b.click()
+                        return (BUTTON_TEXT, text)
+            except Exception:
+                pass
+            return None
+
+        def find_cached(locator):
+            by, value = locator
+            if by == BUTTON_TEXT:
+                for b in self.driver.find_elements(By.TAG_NAME, "button"):
+                    if b.text.strip() == value:
+                        return b
+                raise LookupError(value)
+            return self.driver.find_element(by, value)
+
+        cached = self.locator_cache.get(login_url)
+        if cached:
+            # 先定位全部元素再操作，任何一个失效则整条缓存作废
+            try:
+                user_el = find_cached(cached["username"])
+                pwd_el = find_cached(cached["password"])
+                submit_el = find_cached(cached["submit"])
+                with self._phase("field_fill"):
+                    fill(user_el, user_name)
+                    fill(pwd_el, pwd)
+                with self._phase("submit"):
+                    submit_el.click()
+                log("登录提交已点击（使用缓存的表单定位）", "INFO")
+                return True
+            except Exception:
+                self.locator_cache.invalidate(login_url)
+
+        with self._phase("field_fill"):
+            filled_user = try_fill(USERNAME_CANDIDATES, user_name)
+            filled_pwd = try_fill(PASSWORD_CANDIDATES, pwd)
+
+        if not filled_user or not filled_pwd:
+            log("填写登录表单失败", "WARNING")
+            return False
+
+        with self._phase("submit"):
+            clicked = try_click(SUBMIT_CANDIDATES)
+        if not clicked:
+            log("未找到登录提交按钮", "WARNING")
+            return False
+        log("登录提交已点击", "INFO")
+        self.locator_cache.put(login_url, filled_user, filled_pwd, clicked)
+        return True
+
+    def login_selenium(self, start=None):
+        """简单登录尝试（Selenium 无头浏览器）"""
+        if start is None:
+            start = time.perf_counter()
+        self._completion_reason = None
+        try:
+            log("执行登录流程...", "INFO")
+            self.phase_times = {}
+            warm = self._warm_driver_enabled()
+            reused = warm and self._driver_alive()
+            if not self.ensure_driver():
+                log("无法初始化浏览器，跳过登录", "ERROR")
                 return False
+            login_start = time.perf_counter()
 
-            filled_user = try_fill(username_candidates, user_name)
-            filled_pwd = try_fill(password_candidates, pwd)
+            user_name = self.config.get('username', '')
+            pwd = self.config.get('password', '')
+            login_url = self.config.get('login_url', 'https://gw.buaa.edu.cn/')
 
-            if not filled_user or not filled_pwd:
-                log("填写登录表单失败", "WARNING")
+            if not user_name or not pwd:
+                log("用户名或密码缺失，跳过登录", "WARNING")
                 return False
 
-            clicked = try_click(submit_candidates)
-            if clicked:
-                log("登录提交已点击", "INFO")
-            else:
-                log("未找到登录提交按钮", "WARNING")
+            log(f"尝试登录: {login_url}", "INFO")
+            with self._phase("page_load"):
+                self.driver.get(login_url)
+            start_url = self.driver.current_url
 
-            time.sleep(2)
-            log("登录流程完成", "INFO")
-            
-            try:
-                self.driver.quit()
-                log("已自动关闭登录浏览器窗口", "INFO")
-            except Exception as e:
-                log(f"关闭登录浏览器窗口失败: {e}", "WARNING")
-            finally:
-                self.driver = None
+            submitted = None
+            if self.config.get('scripted_fill', True):
+                submitted = self.fill_form_scripted(login_url, user_name, pwd)
+            if submitted is None:
+                submitted = self.fill_form_elements(login_url, user_name, pwd) or None
 
-            return True
+            ok = False
+            if submitted is not None:
+                with self._phase("verification"):
+                    self._completion_reason = self.wait_for_login_completion(start, start_url)
+                ok = self._completion_reason is not None
+                log("登录流程完成" if ok else "登录已提交，但在期限内未检测到登录成功", "INFO" if ok else "WARNING")
+            kind = "热登录" if reused else "冷启动登录"
+            log(f"{kind}耗时 {time.perf_counter() - login_start:.2f} 秒", "INFO")
+
+            with self._phase("teardown"):
+                self._release_driver(warm)
+            self._log_phases()
+
+            return ok
         except Exception as e:
             log(f"登录时发生错误: {e}", "ERROR")
+            self._note_version_error(e)
             # 异常时也尽量清理浏览器
             try:
                 if self.driver:
+                    self._before_driver_quit()
                     self.driver.quit()
                     log("异常后已关闭浏览器", "INFO")
             except Exception:
@@ -226,31 +688,200 @@ class NetworkChecker:
                 self.driver = None
             return False
 
-    def start_checking(self):
-        """监控循环"""
+    def _release_driver(self, warm):
+        """热驱动模式下停放浏览器，否则关闭"""
+        if warm:
+            self.park_driver()
+            return
+        try:
+            self._before_driver_quit()
+            self.driver.quit()
+            log("已自动关闭登录浏览器窗口", "INFO")
+        except Exception as e:
+            log(f"关闭登录浏览器窗口失败: {e}", "WARNING")
+        finally:
+            self.driver = None
+
+    def logout(self):
+        """按 login_engine 注销当前会话（与 login 的方式及回退规则一致），返回是否成功"""
+        if self._login_engine() == "http":
+            if http_logout(self.config):
+                return True
+            if not self.config.get('login_fallback_selenium', True):
+                return False
+            log("HTTP 注销失败，回退到浏览器注销", "WARNING")
+        return self.logout_selenium()
+
+    def logout_selenium(self):
+        """在门户页面上点击注销按钮（Selenium 无头浏览器），返回是否成功"""
+        if not self.ensure_driver():
+            log("无法初始化浏览器，跳过注销", "ERROR")
+            return False
+        login_url = self.config.get('login_url', 'https://gw.buaa.edu.cn/')
+        try:
+            self.driver.get(login_url)
+            if self.driver.execute_script(_LOGGED_OUT_JS, USERNAME_CANDIDATES):
+                log("门户显示未登录，无需注销", "INFO")
+                ok = True
+            elif not self.driver.execute_script(_CLICK_JS, LOGOUT_SELECTORS, []):
+                log("门户页面上未找到注销按钮", "WARNING")
+                ok = False
+            else:
+                ok = self._wait_for_logout()
+                log("浏览器注销完成" if ok else "已点击注销，但在期限内未回到登录页", "INFO" if ok else "WARNING")
+            self._release_driver(self._warm_driver_enabled())
+            return ok
+        except Exception as e:
+            log(f"浏览器注销时发生错误: {e}", "ERROR")
+            self._note_version_error(e)
+            self._quit_driver()
+            return False
+
+    def _wait_for_logout(self):
+        """点击注销后处理确认框，直到页面出现登录表单；超时返回 False"""
+        deadline = time.monotonic() + float(self.config.get('login_timeout', 10))
+        poll = float(self.config.get('login_poll_interval', 0.2))
+        while time.monotonic() < deadline:
+            try:
+                self.driver.switch_to.alert.accept()
+            except Exception:
+                pass
+            try:
+                if self.driver.execute_script(_LOGGED_OUT_JS, USERNAME_CANDIDATES):
+                    return True
+                self.driver.execute_script(_CLICK_JS, [], CONFIRM_TEXTS)
+            except Exception:
+                pass
+            time.sleep(poll)
+        return False
+
+    def renew_session(self):
+        """会话续期：按 login_engine 注销并立即重新登录，返回 (是否成功, 描述)"""
+        with self._login_lock:
+            if not self.logout():
+                return False, "注销失败"
+            result = self.login()
+        return result.ok, result.detail
+
+    def run_once(self):
+        """执行一轮检查，网络异常时尝试登录，返回本轮探测是否正常（无法判断时为 None）"""
+        ok = self.check_network()
+        if ok is None:
+            # 无法探测不等于断网，登录也解决不了，避免每轮都去请求门户
+            log("无法判断网络状态，跳过登录；请检查 probe_method 与 test_url 配置", "WARNING")
+            return ok
+        if self._needs_browser():
+            check_chrome_chromedriver_matched(extra_para = ok)
+        if ok:
+            self.attempt_count = 0
+            return ok
+        kind = self.classify_failure()
+        if kind not in (None, PORTAL):
+            log("登录无法解决该问题，跳过登录", "INFO")
+            return ok
+        self.breaker.configure(self.config)
+        allowed, reason = self.breaker.allow()
+        if not allowed:
+            log(f"跳过登录: {reason}", "WARNING")
+            get_metrics().inc("login_blocked")
+            self.publish_breaker()
+            return ok
+        self.attempt_count += 1
+        log(f"尝试重连 (第 {self.attempt_count} 次)", "WARNING")
+        with self._login_lock, self.breaker.measure(self.browser_cpu_seconds) as cost:
+            result = self.login(self.attempt_count)
+        cpu, wall = cost
+        metrics = get_metrics()
+        metrics.inc("login_cpu_seconds", cpu)
+        metrics.inc("login_wall_seconds", wall)
+        if self.breaker.record(result.ok, cpu, wall):
+            snapshot = self.breaker.snapshot()
+            message = f"登录熔断器: {STATE_NAMES[snapshot.state]}"
+            if snapshot.next_attempt_at:
+                message += f"，下次允许登录: {time.strftime('%H:%M:%S', time.localtime(snapshot.next_attempt_at))}"
+            log(message, "INFO" if result.ok else "WARNING")
+        self.publish_breaker()
+        return ok
+
+    def publish_breaker(self):
+        s = self.breaker.snapshot()
+        self.events.publish(BreakerUpdated(s.state, s.next_attempt_at, s.cpu_seconds, s.wall_seconds, s.logins))
+
+    def classify_failure(self):
+        """判断断网原因，返回 classifier 中的分类；未启用或分类出错时返回 None（照常登录）"""
+        if not self.config.get('classify_failures', True):
+            return None
+        try:
+            with self._phase("classify"):
+                kind, detail = FailureClassifier.from_config(self.config).classify()
+        except Exception as e:
+            log(f"断网原因分类失败: {e}", "WARNING")
+            return None
+        log(f"断网原因: {FAILURE_NAMES[kind]}（{detail}）", "WARNING")
+        get_metrics().inc(f"failure_{kind}")
+        self.events.publish(FailureClassified(kind, detail))
+        return kind
+
+    def next_delay(self, ok):
+        """根据本轮结果计算下一轮前的等待秒数；无法判断（None）时按常规间隔，不影响退避状态"""
+        self.scheduler.configure(self.config)
+        interval = int(self.config.get('check_interval', 300))
+        if ok is None:
+            return interval
+        delay = self.scheduler.next_delay(ok, interval)
+        if delay < interval:
+            log(f"{delay:.1f} 秒后再次检查", "INFO")
+        return delay
+
+    def begin_monitoring(self, message="开始网络监控"):
+        """监控开始前重置状态并启动附属服务，监控线程与守护进程共用"""
         self.is_running = True
         self.attempt_count = 0
+        self.scheduler.reset()
+        self.breaker.configure(self.config)
+        self.breaker.reset()
+        self._online = None
         interval = int(self.config.get('check_interval', 300))
-        log("开始网络监控", "INFO")
+        self.events.publish(MonitorStarted())
+        log(message, "INFO")
         log(f"检查间隔: {interval} 秒", "INFO")
+        start_exporters(self.config)
+        start_history(self.config)
+        self._sync_renewer()
 
+        if self._warm_driver_enabled():
+            log("热驱动模式已启用，预启动浏览器", "INFO")
+            if self.ensure_driver():
+                self.park_driver()
+
+    def end_monitoring(self, message="网络监控已停止"):
+        """监控循环退出后调用（在 stop_checking 之后），监控线程与守护进程共用"""
+        log(message, "INFO")
+        self.events.publish(MonitorStopped())
+
+    def start_checking(self):
+        """监控循环"""
+        self.begin_monitoring()
         while self.is_running:
-            ok = self.check_network()
-            check_chrome_chromedriver_matched(extra_para = ok)
-            if not ok:
-                self.attempt_count += 1
-                log(f"尝试重连 (第 {self.attempt_count} 次)", "WARNING")
-                self.login()
-            time.sleep(interval)
+            ok = self.run_once()
+            delay = self.next_delay(ok)
+            reason = self.scheduler.wait(delay)
+            if reason == "config":
+                log("配置已变更，立即重新检查", "INFO")
+            elif reason == "session":
+                log("会话续期失败，立即重新检查", "INFO")
 
-        log("网络监控已停止", "INFO")
+        self.end_monitoring()
 
     def stop_checking(self):
         """停止监控与释放资源"""
         self.is_running = False
+        self.scheduler.stop()
+        self.renewer.stop()
         log("正在停止网络监控...", "INFO")
         try:
             if self.driver:
+                self._before_driver_quit()
                 self.driver.quit()
         except Exception as e:
             log(f"关闭浏览器时错误: {e}", "WARNING")
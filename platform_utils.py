@@ -0,0 +1,286 @@
+import os
+import sys
+import shutil
+import subprocess
+
+IS_WINDOWS = os.name == "nt"
+
+def hidden_creationflags():
+    """Windows 下隐藏子进程控制台窗口的 creationflags，其它平台为 0"""
+    if IS_WINDOWS:
+        return getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    return 0
+
+def hide_service_window(service):
+    """为 selenium Service 设置隐藏窗口（仅 Windows 有效）"""
+    flags = hidden_creationflags()
+    if flags:
+        service.creationflags = flags
+    return service
+
+def chromedriver_executable(path):
+    """chromedriver_path 可以是目录或可执行文件本身，返回可执行文件路径"""
+    path = (path or "").strip()
+    if not path:
+        return ""
+    if os.path.isfile(path):
+        return path
+    name = "chromedriver.exe" if IS_WINDOWS else "chromedriver"
+    return os.path.join(path, name)
+
+def _windows_chrome_paths():
+    try:
+        import winreg
+    except ImportError:
+        return []
+    paths = []
+    key_path = r"SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths\chrome.exe"
+    for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        try:
+            with winreg.OpenKey(root, key_path) as key:
+                paths.append(winreg.QueryValue(key, None))
+        except OSError:
+            pass
+    for env in ("PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA"):
+        base = os.environ.get(env)
+        if base:
+            paths.append(os.path.join(base, "Google", "Chrome", "Application", "chrome.exe"))
+    return paths
+
+def chrome_executable():
+    """查找 Chrome 浏览器可执行文件（Windows 先查注册表 App Paths，再查常见安装目录），找不到时返回 None"""
+    if IS_WINDOWS:
+        candidates = _windows_chrome_paths()
+    elif sys.platform == "darwin":
+        candidates = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                      os.path.expanduser("~/Applications/Google Chrome.app/Contents/MacOS/Google Chrome")]
+    else:
+        candidates = [shutil.which(name) for name in
+                      ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")]
+    for path in candidates:
+        if path and os.path.isfile(path):
+            # Linux 上 google-chrome 通常是指向安装目录的符号链接，升级时变化的是目标文件
+            return os.path.realpath(path)
+    return None
+
+def resident_memory_mb():
+    """当前进程常驻内存（MB），无法获取时返回 None"""
+    try:
+        if IS_WINDOWS:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize / (1024 * 1024)
+            return None
+        if os.path.exists("/proc/self/status"):
+            with open("/proc/self/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        import resource
+        # macOS 上 ru_maxrss 为字节，且只能拿到峰值
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
+
+def _descendants(root, children):
+    """root 及其全部子孙进程的 pid（children 为 父 pid -> [子 pid]）"""
+    seen, stack = set(), [root]
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        stack.extend(children.get(pid, ()))
+    return seen
+
+def _windows_process_tree_cpu_seconds(root):
+    """用进程快照找出 root 的子孙进程，累加各进程的 GetProcessTimes"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_void_p),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", ctypes.c_long),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", wintypes.WCHAR * 260),
+        ]
+
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateToolhelp32Snapshot.restype = ctypes.c_void_p
+    kernel32.Process32FirstW.argtypes = (ctypes.c_void_p, ctypes.POINTER(PROCESSENTRY32W))
+    kernel32.Process32NextW.argtypes = (ctypes.c_void_p, ctypes.POINTER(PROCESSENTRY32W))
+    kernel32.OpenProcess.restype = ctypes.c_void_p
+    kernel32.GetProcessTimes.argtypes = (ctypes.c_void_p,) + (ctypes.POINTER(ctypes.c_uint64),) * 4
+    kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+
+    # 2 = TH32CS_SNAPPROCESS
+    snapshot = kernel32.CreateToolhelp32Snapshot(2, 0)
+    if not snapshot or snapshot == ctypes.c_void_p(-1).value:
+        return None
+    children = {}
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(entry)
+        ok = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while ok:
+            children.setdefault(entry.th32ParentProcessID, []).append(entry.th32ProcessID)
+            ok = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    total = 0.0
+    for pid in _descendants(root, children):
+        # 0x1000 = PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            continue
+        try:
+            creation, exited, kernel, user = (ctypes.c_uint64() for _ in range(4))
+            if kernel32.GetProcessTimes(handle, ctypes.byref(creation), ctypes.byref(exited),
+                                        ctypes.byref(kernel), ctypes.byref(user)):
+                # 时间单位为 100 纳秒
+                total += (kernel.value + user.value) / 1e7
+        finally:
+            kernel32.CloseHandle(handle)
+    return total
+
+def process_tree_cpu_supported():
+    """当前平台能否统计指定进程树的 CPU 时间（Windows 与有 /proc 的系统）"""
+    return IS_WINDOWS or os.path.isdir("/proc")
+
+def process_tree_cpu_seconds(root):
+    """进程 root 及其仍在运行的子孙进程累计 CPU 秒数，不支持的平台或出错时返回 None
+
+    用于只统计某个浏览器会话（chromedriver 及其启动的 Chrome 进程），
+    不包含本进程的其它线程或其它浏览器；已退出的进程无法统计，应在关闭浏览器前采样。
+    """
+    if not root:
+        return None
+    if IS_WINDOWS:
+        try:
+            return _windows_process_tree_cpu_seconds(root)
+        except Exception:
+            return None
+    if not os.path.isdir("/proc"):
+        return None
+    try:
+        ticks = os.sysconf("SC_CLK_TCK")
+        children, cpu = {}, {}
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{name}/stat", "r") as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # comm 字段可能包含空格，从最后一个右括号之后解析
+            fields = stat[stat.rfind(")") + 2:].split()
+            children.setdefault(int(fields[1]), []).append(int(name))
+            cpu[int(name)] = (int(fields[11]) + int(fields[12])) / ticks
+        return sum(cpu.get(pid, 0.0) for pid in _descendants(root, children))
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _windows_network_bytes():
+    """GetIfTable2 统计的物理网卡累计收发字节数，失败时返回 None"""
+    import ctypes
+    from ctypes import wintypes
+
+    class MIB_IF_ROW2(ctypes.Structure):
+        _fields_ = [
+            ("InterfaceLuid", ctypes.c_uint64),
+            ("InterfaceIndex", wintypes.ULONG),
+            ("InterfaceGuid", ctypes.c_ubyte * 16),
+            ("Alias", wintypes.WCHAR * 257),
+            ("Description", wintypes.WCHAR * 257),
+            ("PhysicalAddressLength", wintypes.ULONG),
+            ("PhysicalAddress", ctypes.c_ubyte * 32),
+            ("PermanentPhysicalAddress", ctypes.c_ubyte * 32),
+            ("Mtu", wintypes.ULONG),
+            ("Type", wintypes.ULONG),
+            ("TunnelType", ctypes.c_int),
+            ("MediaType", ctypes.c_int),
+            ("PhysicalMediumType", ctypes.c_int),
+            ("AccessType", ctypes.c_int),
+            ("DirectionType", ctypes.c_int),
+            ("InterfaceAndOperStatusFlags", ctypes.c_ubyte),
+            ("OperStatus", ctypes.c_int),
+            ("AdminStatus", ctypes.c_int),
+            ("MediaConnectState", ctypes.c_int),
+            ("NetworkGuid", ctypes.c_ubyte * 16),
+            ("ConnectionType", ctypes.c_int),
+            ("TransmitLinkSpeed", ctypes.c_uint64),
+            ("ReceiveLinkSpeed", ctypes.c_uint64),
+            ("InOctets", ctypes.c_uint64),
+        ] + [(name, ctypes.c_uint64) for name in (
+            "InUcastPkts", "InNUcastPkts", "InDiscards", "InErrors", "InUnknownProtos", "InUcastOctets",
+            "InMulticastOctets", "InBroadcastOctets", "OutOctets", "OutUcastPkts", "OutNUcastPkts", "OutDiscards",
+            "OutErrors", "OutUcastOctets", "OutMulticastOctets", "OutBroadcastOctets", "OutQLen")]
+
+    class MIB_IF_TABLE2(ctypes.Structure):
+        _fields_ = [("NumEntries", wintypes.ULONG), ("Table", MIB_IF_ROW2 * 1)]
+
+    try:
+        iphlpapi = ctypes.windll.iphlpapi
+        table = ctypes.POINTER(MIB_IF_TABLE2)()
+        if iphlpapi.GetIfTable2(ctypes.byref(table)) != 0:
+            return None
+        try:
+            rows = ctypes.cast(ctypes.byref(table.contents.Table),
+                               ctypes.POINTER(MIB_IF_ROW2 * table.contents.NumEntries)).contents
+            total = 0
+            for row in rows:
+                # 只统计已启用的硬件网卡：跳过回环（Type 24）与同一网卡上叠加的过滤驱动接口，避免重复计数
+                flags = row.InterfaceAndOperStatusFlags
+                if row.Type != 24 and flags & 1 and not flags & 2 and row.OperStatus == 1:
+                    total += row.InOctets + row.OutOctets
+            return total
+        finally:
+            iphlpapi.FreeMibTable(table)
+    except Exception:
+        return None
+
+def network_bytes():
+    """所有非回环网卡累计收发字节数，无法获取时返回 None（支持 Linux 与 Windows）"""
+    if IS_WINDOWS:
+        return _windows_network_bytes()
+    try:
+        with open("/proc/net/dev", "r") as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return None
+    total = 0
+    for line in lines:
+        name, _, data = line.partition(":")
+        if name.strip() == "lo":
+            continue
+        fields = data.split()
+        total += int(fields[0]) + int(fields[8])
+    return total
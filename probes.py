@@ -0,0 +1,342 @@
+import os
+import time
+import socket
+import struct
+import ssl
+import http.client
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from dns_cache import get_resolver
+
+@dataclass
+class ProbeResult:
+    """单次探测结果，rtt 单位为毫秒"""
+    ok: bool
+    method: str
+    target: str
+    rtt: float = None
+    error: str = ""
+
+class ProbeUnavailable(Exception):
+    """当前系统不支持该探测方式（如无权限创建 ICMP 套接字）"""
+
+def parse_target(test_url):
+    """从 test_url 中解析 (scheme, host, port, path)，未写明时 scheme 为空、port 为 None
+
+    支持 host、host:port、[IPv6]:port 与不带方括号的 IPv6 地址；端口或主机无效时抛出 ValueError。
+    """
+    if not test_url:
+        test_url = "https://kimi.moonshot.cn"
+    schemeless = "://" not in test_url
+    if schemeless and test_url.count(":") > 1 and "[" not in test_url:
+        # 不带端口的 IPv6 地址
+        return "", test_url.split("/")[0], None, "/"
+    parsed = urlparse("//" + test_url if schemeless else test_url)
+    host = parsed.hostname
+    if not host:
+        raise ValueError(f"探测目标 {test_url!r} 缺少主机名")
+    try:
+        port = parsed.port
+    except ValueError:
+        raise ValueError(f"探测目标 {test_url!r} 的端口无效") from None
+    if schemeless:
+        return "", host, port, "/"
+    scheme = parsed.scheme or "https"
+    port = port or (80 if scheme == "http" else 443)
+    return scheme, host, port, parsed.path or "/"
+
+def check_targets(test_url):
+    """校验 test_url 中的全部目标，有无效目标时抛出 ValueError（加载配置时调用，而不是每次探测）"""
+    errors = []
+    for target in split_targets(test_url):
+        try:
+            parse_target(target)
+        except ValueError as e:
+            errors.append(str(e))
+    if errors:
+        raise ValueError("; ".join(errors))
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+class Probe:
+    method = "base"
+
+    def __init__(self, host, timeout=1.5, resolver=None, source=None):
+        self.host = host
+        self.timeout = float(timeout)
+        self.resolver = resolver or get_resolver()
+        self.source = source or None   # 绑定的本机源地址（多网卡时指定出口）
+
+    @property
+    def worst_case(self):
+        """一次探测最长可能耗时（秒），DNS 解析计入连接超时"""
+        return self.timeout
+
+    def run(self):
+        raise NotImplementedError
+
+    def _connect(self, port):
+        """经 DNS 缓存解析后建立 TCP 连接，解析时间计入本探测的超时"""
+        start = time.monotonic()
+        addrs = self.resolver.resolve(self.host, self.timeout)
+        last_error = None
+        for addr in addrs:
+            remaining = self.timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            try:
+                return socket.create_connection((addr, port), timeout=remaining,
+                                                source_address=(self.source, 0) if self.source else None)
+            except OSError as e:
+                last_error = e
+        raise last_error or socket.timeout("连接超时")
+
+    def __call__(self):
+        start = time.perf_counter()
+        try:
+            self.run()
+            return ProbeResult(True, self.method, self.host, (time.perf_counter() - start) * 1000)
+        except ProbeUnavailable:
+            raise
+        except Exception as e:
+            return ProbeResult(False, self.method, self.host, None, str(e) or type(e).__name__)
+
+class IcmpProbe(Probe):
+    """无特权 ICMP 回显（SOCK_DGRAM + IPPROTO_ICMP），需系统允许"""
+    method = "icmp"
+
+    @property
+    def worst_case(self):
+        # 解析与等待回显各有一次超时
+        return self.timeout * 2
+
+    def run(self):
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        except (PermissionError, OSError, AttributeError) as e:
+            raise ProbeUnavailable(str(e))
+        with sock:
+            if self.source:
+                sock.bind((self.source, 0))
+            sock.settimeout(self.timeout)
+            addr = self.resolver.resolve_ipv4(self.host, self.timeout)
+            seq = os.getpid() & 0xffff
+            payload = struct.pack("!d", time.time())
+            header = struct.pack("!BBHHH", 8, 0, 0, 0, seq)
+            packet = struct.pack("!BBHHH", 8, 0, _icmp_checksum(header + payload), 0, seq) + payload
+            sock.sendto(packet, (addr, 0))
+            deadline = time.monotonic() + self.timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("ICMP 回显超时")
+                sock.settimeout(remaining)
+                data, _ = sock.recvfrom(1024)
+                # 部分系统会带上 IP 头
+                if len(data) >= 20 and data[0] >> 4 == 4:
+                    data = data[(data[0] & 0x0f) * 4:]
+                if len(data) >= 8 and data[0] == 0 and data[8:] == payload:
+                    return
+
+class TcpProbe(Probe):
+    """TCP 三次握手探测"""
+    method = "tcp"
+
+    def __init__(self, host, port=443, timeout=1.5, resolver=None, source=None):
+        super().__init__(host, timeout, resolver, source)
+        self.port = int(port)
+
+    def run(self):
+        with self._connect(self.port):
+            pass
+
+class HttpProbe(Probe):
+    """HTTP 探测，不跟随跳转
+
+    expect_status 为 204 等具体状态码时（generate_204 风格）必须完全一致；为 None 时接受 2xx，
+    以及 https 的任何 3xx 和 http 指向同一主机的 3xx（跳转到其他主机通常是门户劫持）。
+    """
+    method = "http"
+
+    def __init__(self, host, port=80, path="/generate_204", scheme="http", timeout=3.0, expect_status=204,
+                 resolver=None, source=None):
+        super().__init__(host, timeout, resolver, source)
+        self.port = int(port)
+        self.path = path or "/generate_204"
+        self.scheme = scheme or "http"
+        self.expect_status = None if expect_status is None else int(expect_status)
+
+    @property
+    def worst_case(self):
+        # 建立连接与等待响应各有一次超时
+        return self.timeout * 2
+
+    def run(self):
+        sock = self._connect(self.port)
+        if self.scheme == "https":
+            try:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+            except Exception:
+                sock.close()
+                raise
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        conn.sock = sock
+        try:
+            conn.request("GET", self.path, headers={"User-Agent": "AutoConnect"})
+            resp = conn.getresponse()
+            resp.read(1024)
+            if self.expect_status is not None:
+                if resp.status != self.expect_status:
+                    raise RuntimeError(f"HTTP 状态码 {resp.status}，预期 {self.expect_status}")
+            elif 300 <= resp.status < 400:
+                location = urlparse(resp.getheader("Location") or "")
+                if self.scheme != "https" and location.hostname not in (None, self.host):
+                    raise RuntimeError(f"HTTP 状态码 {resp.status}，被重定向到 {location.hostname}")
+            elif not 200 <= resp.status < 300:
+                raise RuntimeError(f"HTTP 状态码 {resp.status}，预期 2xx/3xx")
+        finally:
+            conn.close()
+
+class AutoProbe(Probe):
+    """优先 ICMP，系统不支持时退回 TCP
+
+    ICMP 失败而 TCP 成功说明 ICMP 被过滤（校园网常见），之后 icmp_retry 秒内只用 TCP，
+    避免每次都先等满 ICMP 超时。
+    """
+    method = "auto"
+
+    def __init__(self, host, port=443, timeout=1.5, resolver=None, source=None, icmp_retry=600.0):
+        super().__init__(host, timeout, resolver, source)
+        self.icmp = IcmpProbe(host, timeout, self.resolver, source)
+        self.tcp = TcpProbe(host, port, timeout, self.resolver, source)
+        self.icmp_retry = float(icmp_retry)
+        self._icmp_available = True
+        self._icmp_skip_until = 0.0
+
+    @property
+    def worst_case(self):
+        return self.icmp.worst_case + self.tcp.worst_case
+
+    def __call__(self):
+        if not self._icmp_available or time.monotonic() < self._icmp_skip_until:
+            return self.tcp()
+        try:
+            result = self.icmp()
+        except ProbeUnavailable:
+            self._icmp_available = False
+            return self.tcp()
+        if result.ok:
+            return result
+        result = self.tcp()
+        if result.ok:
+            self._icmp_skip_until = time.monotonic() + self.icmp_retry
+        return result
+
+def make_probe(test_url, method="auto", timeout=None, source=None, http_timeout=None):
+    """根据探测方式与 test_url 构造探测器，source 为可选的本机源地址
+
+    timeout 只用于 ICMP / TCP；HTTP 探测要等门户响应，单独使用 http_timeout（默认 3 秒）。
+    """
+    method = (method or "auto").strip().lower()
+    scheme, host, port, path = parse_target(test_url)
+    if method == "icmp":
+        return IcmpProbe(host, timeout or 1.5, source=source)
+    if method == "tcp":
+        return TcpProbe(host, port or 443, timeout or 1.5, source=source)
+    if method == "http":
+        # 只有 generate_204 端点才要求 204；其他地址（如未写路径的首页）接受 2xx/3xx
+        expect = 204 if path.rstrip("/").endswith("generate_204") else None
+        return HttpProbe(host, port or 80, path, scheme or "http", http_timeout or 3.0, expect, source=source)
+    return AutoProbe(host, port or 443, timeout or 1.5, source=source)
+
+def split_targets(test_url):
+    """test_url 可以是列表，也可以是逗号/空白分隔的字符串"""
+    if not test_url:
+        return ["https://kimi.moonshot.cn"]
+    if isinstance(test_url, str):
+        test_url = test_url.replace(",", " ").replace("，", " ").split()
+    return [t.strip() for t in test_url if t and t.strip()] or ["https://kimi.moonshot.cn"]
+
+class MultiProbe(Probe):
+    """并发探测多个目标，达到法定成功数（quorum）即判定网络正常
+
+    quorum 为 1 时即“首个成功者胜出”；整体耗时不超过 deadline。
+    所有目标的探测方式都不可用时抛出 ProbeUnavailable，而不是判定为断网。
+    可传入共享的 executor（如批量监控多个配置时），此时 close 不会关闭它。
+    """
+    method = "multi"
+
+    def __init__(self, probes, quorum=1, deadline=3.0, executor=None):
+        super().__init__(",".join(p.host for p in probes), deadline)
+        self.probes = list(probes)
+        self.quorum = max(1, min(int(quorum), len(self.probes)))
+        self.last_results = []
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=len(self.probes), thread_name_prefix="probe")
+
+    def __call__(self):
+        start = time.perf_counter()
+        futures = {self._executor.submit(p): p for p in self.probes}
+        pending = set(futures)
+        results = []
+        successes = 0
+        unavailable = []
+        allowed_failures = len(self.probes) - self.quorum
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    result = fut.result()
+                except ProbeUnavailable as e:
+                    probe = futures[fut]
+                    unavailable.append(str(e))
+                    result = ProbeResult(False, probe.method, probe.host, None, f"不可用: {e}")
+                results.append(result)
+                successes += result.ok
+            if successes >= self.quorum or len(results) - successes > allowed_failures:
+                break
+        for fut in pending:
+            fut.cancel()
+        self.last_results = results
+        if len(unavailable) == len(self.probes):
+            raise ProbeUnavailable(unavailable[0])
+        elapsed = (time.perf_counter() - start) * 1000
+        ok = successes >= self.quorum
+        summary = f"{successes}/{len(self.probes)} 成功（需 {self.quorum}）"
+        if ok:
+            return ProbeResult(True, self.method, summary, elapsed)
+        errors = "; ".join(f"{r.target}: {r.error}" for r in results if not r.ok)
+        if pending:
+            errors = (errors + "; " if errors else "") + f"{len(pending)} 个目标超时"
+        return ProbeResult(False, self.method, summary, None, errors)
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+def make_multi_probe(test_url, method="auto", timeout=None, quorum=1, deadline=None, source=None, executor=None,
+                     http_timeout=None):
+    """为多个目标构造并发探测器；只有一个目标时直接返回单目标探测器
+
+    deadline 为整轮并发探测的期限，默认取各目标最坏耗时（worst_case）的最大值。
+    单目标探测器不使用 deadline，其耗时由 timeout 决定（最多 worst_case 秒）。
+    """
+    targets = split_targets(test_url)
+    probes = [make_probe(t, method, timeout, source, http_timeout) for t in targets]
+    if len(probes) == 1:
+        return probes[0]
+    if deadline is None:
+        deadline = max(p.worst_case for p in probes)
+    return MultiProbe(probes, quorum, deadline, executor)
@@ -0,0 +1,22 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from events import get_event_bus
+
+class EventSignalBridge(QObject):
+    """把事件总线上的事件转为 Qt 信号
+
+    事件在监控线程中发布，接收方以 Qt.QueuedConnection 连接 event_received，
+    槽函数会在接收对象所在的主线程中执行。
+    """
+    event_received = pyqtSignal(object)
+
+    def __init__(self, *event_types, parent=None):
+        super().__init__(parent)
+        token = self._token = get_event_bus().subscribe(self.event_received.emit, *event_types)
+        # C++ 对象销毁后不能再引用 self，用闭包保存令牌
+        self.destroyed.connect(lambda *_: get_event_bus().unsubscribe(token))
+
+    def close(self):
+        if self._token is not None:
+            get_event_bus().unsubscribe(self._token)
+            self._token = None
@@ -0,0 +1,205 @@
+"""会话主动续期：在门户踢下线之前重新认证，避免到期后才发现断网
+
+- 每 session_poll_interval 秒通过 rad_user_info 查询会话剩余时间与剩余流量
+- 门户未返回 remain_seconds 时，可用 session_max_duration 按登录时间（add_time）推算
+- 剩余时间不足 session_renew_margin 秒时进入续期窗口，每 session_idle_poll 秒检查一次网卡流量，
+  速率低于 session_idle_rate 字节/秒视为空闲，在空闲时注销并立即重新登录
+- 剩余时间不足 session_renew_force 秒时不再等待空闲，直接续期；
+  无法获取网卡流量时（见 platform_utils.network_bytes）无从判断空闲，同样等到这一刻再续期
+- 注销与重新登录由 reauth 完成（NetworkChecker.renew_session，与常规登录使用同一 login_engine），
+  未提供时直接通过 HTTP 注销并登录
+- 续期失败时唤醒监控循环，交给常规的探测与登录流程处理
+
+剩余流量只记录与发布，重新认证无法恢复流量配额。
+"""
+import time
+import threading
+from dataclasses import dataclass, field
+
+from logger import log
+from metrics import get_metrics
+from platform_utils import network_bytes
+
+@dataclass
+class SessionStatus:
+    """门户报告的会话状态，剩余时间或流量未知时为 None"""
+    online: bool
+    remaining_seconds: float = None
+    remaining_bytes: int = None
+    at: float = field(default_factory=time.time)
+
+def parse_session(info, max_duration=0, now=None):
+    """从 rad_user_info 的返回中解析 SessionStatus"""
+    now = time.time() if now is None else now
+    if info.get("error") == "not_online_error" or not (info.get("error") == "ok" or info.get("user_name")):
+        return SessionStatus(False, at=now)
+    remaining = None
+    try:
+        if float(info.get("remain_seconds") or 0) > 0:
+            remaining = float(info["remain_seconds"])
+        elif max_duration and info.get("add_time"):
+            remaining = float(max_duration) - (now - float(info["add_time"]))
+    except (TypeError, ValueError):
+        pass
+    remaining_bytes = None
+    try:
+        if int(info.get("remain_bytes") or 0) > 0:
+            remaining_bytes = int(info["remain_bytes"])
+    except (TypeError, ValueError):
+        pass
+    return SessionStatus(True, remaining, remaining_bytes, now)
+
+def describe_session(status):
+    """会话剩余时间与流量的简短描述"""
+    if not status.online:
+        return "未在线"
+    parts = []
+    if status.remaining_seconds is not None:
+        seconds = max(0.0, status.remaining_seconds)
+        parts.append(f"剩余 {seconds:.0f} 秒" if seconds < 120 else f"剩余 {seconds / 60:.0f} 分钟")
+    if status.remaining_bytes is not None:
+        parts.append(f"剩余流量 {status.remaining_bytes / 1024 / 1024:.0f} MB")
+    return "，".join(parts) or "在线（门户未报告剩余时长）"
+
+class SessionRenewer:
+    def __init__(self, get_config, on_lost=None, events=None, reauth=None):
+        self.get_config = get_config
+        self.on_lost = on_lost
+        self.events = events
+        self.reauth = reauth   # 无参调用，注销并重新登录，返回 (是否成功, 描述)
+        self.last_status = None
+        self.renewals = 0
+        self._renewed_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """按配置启动续期线程，返回是否已启动"""
+        if not self.get_config().get('session_renewal', False):
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-renewal", daemon=True)
+        self._thread.start()
+        log("会话主动续期已启用", "INFO")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def _client(self, config):
+        from srun_login import portal_client
+        return portal_client(config)
+
+    def poll(self, config):
+        """查询一次会话状态，门户不可达时返回 None"""
+        try:
+            info = self._client(config).user_info()
+        except Exception as e:
+            log(f"查询会话状态失败: {e}", "WARNING")
+            return None
+        status = parse_session(info, float(config.get('session_max_duration') or 0))
+        self.last_status = status
+        if status.online and (status.remaining_seconds is not None or status.remaining_bytes is not None):
+            log(f"会话状态: {describe_session(status)}", "INFO")
+        if self.events:
+            self.events.publish(status)
+        return status
+
+    def renew(self, config):
+        """注销并立即重新登录，返回是否成功"""
+        username = config.get('username', '')
+        password = config.get('password', '')
+        if not username or not password:
+            log("用户名或密码缺失，跳过会话续期", "WARNING")
+            return False
+        metrics = get_metrics()
+        metrics.inc("session_renewal_attempt")
+        start = time.perf_counter()
+        try:
+            if self.reauth:
+                ok, detail = self.reauth()
+            else:
+                client = self._client(config)
+                client.logout(username)
+                ok, detail = client.login(username, password)
+        except Exception as e:
+            ok, detail = False, str(e)
+        elapsed = time.perf_counter() - start
+        metrics.observe("session_renewal", elapsed)
+        metrics.inc("session_renewed" if ok else "session_renewal_failed")
+        if ok:
+            self.renewals += 1
+            self._renewed_at = time.monotonic()
+            log(f"会话已续期，用时 {elapsed:.2f} 秒（{detail}）", "INFO", phase="session_renewal", duration=elapsed)
+        else:
+            log(f"会话续期失败: {detail}", "WARNING", phase="session_renewal", duration=elapsed)
+        return ok
+
+    def _wait(self, seconds):
+        return self._stop.wait(max(0.5, seconds))
+
+    def _idle_rate(self, interval):
+        """interval 秒内的网卡流量速率（字节/秒），无法获取时返回 None"""
+        before = network_bytes()
+        if before is None or self._wait(interval):
+            return None
+        after = network_bytes()
+        return None if after is None else max(0, after - before) / interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            config = self.get_config()
+            poll_interval = float(config.get('session_poll_interval', 600))
+            if not config.get('session_renewal', False):
+                self._wait(poll_interval)
+                continue
+            status = self.poll(config)
+            if status is None or not status.online or status.remaining_seconds is None:
+                # 离线由监控循环处理；剩余时间未知时只能等待下次查询
+                self._wait(poll_interval)
+                continue
+            margin = float(config.get('session_renew_margin', 300))
+            if status.remaining_seconds > margin:
+                self._wait(min(poll_interval, status.remaining_seconds - margin))
+                continue
+            if self._renewed_at is not None and time.monotonic() - self._renewed_at < margin:
+                # 刚续期过剩余时间却没有恢复，说明门户不按登录重置时长，避免反复注销
+                log(f"续期后会话剩余时间仍为 {status.remaining_seconds:.0f} 秒，暂不再续期", "WARNING")
+                self._wait(poll_interval)
+                continue
+            self._renew_when_idle(config, status)
+
+    def _renew_when_idle(self, config, status):
+        force = float(config.get('session_renew_force', 30))
+        idle_poll = float(config.get('session_idle_poll', 5))
+        idle_rate = float(config.get('session_idle_rate', 10240))
+        deadline = time.monotonic() + status.remaining_seconds - force
+        log(f"会话剩余 {status.remaining_seconds:.0f} 秒，等待空闲时续期", "INFO")
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                log("会话即将到期，不再等待空闲，直接续期", "INFO")
+                break
+            rate = self._idle_rate(min(idle_poll, remaining))
+            if self._stop.is_set():
+                return
+            if rate is None:
+                log(f"无法获取网卡流量，{max(0.0, deadline - time.monotonic()):.0f} 秒后直接续期", "INFO")
+                if self._wait(deadline - time.monotonic()):
+                    return
+                break
+            if rate < idle_rate:
+                break
+        if self._stop.is_set():
+            return
+        if not self.renew(config) and self.on_lost:
+            self.on_lost()
@@ -0,0 +1,78 @@
+import random
+import threading
+
+class AdaptiveScheduler:
+    """监控循环的自适应、可中断调度器
+
+    - 停止或配置变更时立即唤醒
+    - 失败或刚登录后快速复查（fast 秒）
+    - 网络持续异常时按指数退避并加入抖动
+    - 连续 stable_checks 次正常后恢复到配置的检查间隔
+    """
+
+    def __init__(self, fast=5.0, stable_checks=2, jitter=0.2, max_backoff=None):
+        self.fast = float(fast)
+        self.stable_checks = int(stable_checks)
+        self.jitter = float(jitter)
+        self.max_backoff = max_backoff
+        self.consecutive_failures = 0
+        # 启动时视为已稳定，首次检查正常即使用常规间隔
+        self.consecutive_ok = self.stable_checks
+        self._cond = threading.Condition()
+        self._wake_reason = None
+        self._stopped = False
+
+    def configure(self, config):
+        """从配置读取调度参数"""
+        self.fast = float(config.get('fast_recheck_interval', self.fast))
+        self.stable_checks = int(config.get('stable_checks', self.stable_checks))
+        self.max_backoff = config.get('max_backoff') or None
+
+    def next_delay(self, ok, interval):
+        """根据本轮结果计算下一次检查前的等待秒数
+
+        失败（随后会触发登录）后的第一次复查间隔为 fast，之后按指数退避。
+        """
+        interval = float(interval)
+        if ok:
+            self.consecutive_failures = 0
+            self.consecutive_ok += 1
+            if self.consecutive_ok > self.stable_checks:
+                return interval
+            delay = self.fast
+        else:
+            self.consecutive_ok = 0
+            self.consecutive_failures += 1
+            cap = float(self.max_backoff or interval)
+            delay = min(cap, self.fast * 2 ** (self.consecutive_failures - 1))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.5, min(delay, interval))
+
+    def wait(self, delay):
+        """等待 delay 秒，返回唤醒原因：'timeout'、'stop' 或 wake() 传入的原因"""
+        with self._cond:
+            if self._stopped:
+                return "stop"
+            if self._wake_reason is None:
+                self._cond.wait_for(lambda: self._wake_reason is not None or self._stopped, timeout=delay)
+            if self._stopped:
+                return "stop"
+            reason, self._wake_reason = self._wake_reason, None
+            return reason or "timeout"
+
+    def wake(self, reason="wake"):
+        with self._cond:
+            self._wake_reason = reason
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def reset(self):
+        with self._cond:
+            self._stopped = False
+            self._wake_reason = None
+        self.consecutive_failures = 0
+        self.consecutive_ok = self.stable_checks
@@ -0,0 +1,312 @@
+import hashlib
+import hmac
+import json
+import math
+import re
+import ssl
+import time
+import socket
+import base64
+from urllib.parse import urlencode, urlparse, parse_qs
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.request import Request, build_opener, HTTPHandler, HTTPSHandler
+
+from logger import log
+from dns_cache import get_resolver, DnsLookupError
+
+# 深澜（Srun）认证页面使用的自定义 Base64 字母表
+_STD_ALPHA = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_SRUN_ALPHA = "LVoJPiCN2R8G90yg+hmFHuacZ1OWMnrsSTXkYpUq/3dlbfKwv6xztjI7DeBE45QA"
+_B64_TABLE = str.maketrans(_STD_ALPHA, _SRUN_ALPHA)
+
+_JSONP_RE = re.compile(r'^[^(]*\((.*)\)\s*;?\s*$', re.S)
+
+def _ordat(msg, idx):
+    if len(msg) > idx:
+        return ord(msg[idx])
+    return 0
+
+def _sencode(msg, key):
+    length = len(msg)
+    pwd = []
+    for i in range(0, length, 4):
+        pwd.append(
+            _ordat(msg, i) | _ordat(msg, i + 1) << 8
+            | _ordat(msg, i + 2) << 16 | _ordat(msg, i + 3) << 24
+        )
+    if key:
+        pwd.append(length)
+    return pwd
+
+def _lencode(msg):
+    return "".join(
+        chr(v & 0xff) + chr(v >> 8 & 0xff) + chr(v >> 16 & 0xff) + chr(v >> 24 & 0xff)
+        for v in msg
+    )
+
+def xencode(msg, key):
+    """深澜门户 JS 中 xEncode 的 Python 实现"""
+    if msg == "":
+        return ""
+    pwd = _sencode(msg, True)
+    pwdk = _sencode(key, False)
+    if len(pwdk) < 4:
+        pwdk = pwdk + [0] * (4 - len(pwdk))
+    n = len(pwd) - 1
+    z = pwd[n]
+    c = 0x86014019 | 0x183639A0
+    q = math.floor(6 + 52 / (n + 1))
+    d = 0
+    while q > 0:
+        d = d + c & 0xFFFFFFFF
+        e = d >> 2 & 3
+        p = 0
+        while p < n:
+            y = pwd[p + 1]
+            m = z >> 5 ^ y << 2
+            m = m + ((y >> 3 ^ z << 4) ^ (d ^ y))
+            m = m + (pwdk[(p & 3) ^ e] ^ z)
+            pwd[p] = pwd[p] + m & 0xFFFFFFFF
+            z = pwd[p]
+            p += 1
+        y = pwd[0]
+        m = z >> 5 ^ y << 2
+        m = m + ((y >> 3 ^ z << 4) ^ (d ^ y))
+        m = m + (pwdk[(p & 3) ^ e] ^ z)
+        pwd[n] = pwd[n] + m & 0xFFFFFFFF
+        z = pwd[n]
+        q -= 1
+    return _lencode(pwd)
+
+def srun_base64(data):
+    """使用深澜字母表的 Base64 编码"""
+    raw = base64.b64encode(data.encode('latin-1')).decode('ascii')
+    return raw.translate(_B64_TABLE)
+
+def encode_info(username, password, ip, ac_id, token, enc_ver="srun_bx1"):
+    info = json.dumps({
+        "username": username,
+        "password": password,
+        "ip": ip,
+        "acid": ac_id,
+        "enc_ver": enc_ver,
+    }, separators=(',', ':'))
+    return "{SRBX1}" + srun_base64(xencode(info, token))
+
+def hmac_md5(password, token):
+    return hmac.new(token.encode('utf-8'), password.encode('utf-8'), hashlib.md5).hexdigest()
+
+def checksum(token, username, hmd5, ac_id, ip, n, type_, info):
+    parts = [username, hmd5, ac_id, ip, n, type_, info]
+    text = token + token.join(parts)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def parse_jsonp(text):
+    """解析 jQuery 回调包装的 JSON 响应"""
+    text = text.strip()
+    m = _JSONP_RE.match(text)
+    if m:
+        text = m.group(1)
+    return json.loads(text)
+
+def _ssl_context():
+    try:
+        import certifi
+        return ssl.create_default_context(cafile=certifi.where())
+    except Exception:
+        return ssl.create_default_context()
+
+def _create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    """与 socket.create_connection 相同，但经进程内 DNS 缓存解析，解析时间计入连接超时"""
+    host, port = address[:2]
+    limit = timeout if isinstance(timeout, (int, float)) else None
+    start = time.monotonic()
+    addrs = get_resolver().resolve(host, limit)
+    last_error = None
+    for addr in addrs:
+        remaining = timeout
+        if limit is not None:
+            remaining = limit - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+        try:
+            return socket.create_connection((addr, port), remaining, source_address)
+        except OSError as e:
+            last_error = e
+    raise last_error or socket.timeout("连接超时")
+
+class _CachedHTTPConnection(HTTPConnection):
+    """连接缓存中的地址，Host 头仍使用原主机名"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_connection
+
+class _CachedHTTPSConnection(HTTPSConnection):
+    """连接缓存中的地址，Host 头与 TLS 的 SNI、证书校验仍使用原主机名"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_connection
+
+class _PortalHTTPHandler(HTTPHandler):
+    """经 DNS 缓存连接门户，可从指定本机地址发起连接"""
+
+    def __init__(self, source_address=None):
+        super().__init__()
+        self.source_address = source_address
+
+    def http_open(self, req):
+        return self.do_open(_CachedHTTPConnection, req, source_address=self.source_address)
+
+class _PortalHTTPSHandler(HTTPSHandler):
+    def __init__(self, source_address, context):
+        super().__init__(context=context)
+        self.source_address = source_address
+
+    def https_open(self, req):
+        return self.do_open(_CachedHTTPSConnection, req, context=self._context, source_address=self.source_address)
+
+class SrunPortalClient:
+    """不依赖浏览器、直接通过 HTTP 完成深澜门户认证"""
+
+    CALLBACK = "jQuery1124"
+    N = "200"
+    TYPE = "1"
+
+    def __init__(self, login_url, timeout=5.0, ac_id=None, source_address=None):
+        parsed = urlparse(login_url or "https://gw.buaa.edu.cn/")
+        self.base_url = f"{parsed.scheme or 'https'}://{parsed.netloc or parsed.path.strip('/')}"
+        self.login_url = login_url
+        self.timeout = timeout
+        self.ac_id = str(ac_id) if ac_id else None
+        source = (source_address, 0) if source_address else None
+        self.opener = build_opener(_PortalHTTPHandler(source), _PortalHTTPSHandler(source, _ssl_context()))
+
+    def _get(self, path, params=None):
+        url = self.base_url + path
+        if params is not None:
+            url += "?" + urlencode(params)
+        req = Request(url, headers={"User-Agent": "Mozilla/5.0 AutoConnect"})
+        with self.opener.open(req, timeout=self.timeout) as resp:
+            return resp.geturl(), resp.read().decode('utf-8', errors='ignore')
+
+    def _jsonp(self, path, params):
+        params = dict(params, callback=self.CALLBACK, _=int(time.time() * 1000))
+        _, body = self._get(path, params)
+        return parse_jsonp(body)
+
+    def detect_ac_id(self):
+        """从门户首页跳转地址中解析 ac_id，失败时回退为 1"""
+        if self.ac_id:
+            return self.ac_id
+        try:
+            final_url, body = self._get("/")
+            qs = parse_qs(urlparse(final_url).query)
+            if qs.get("ac_id"):
+                self.ac_id = qs["ac_id"][0]
+            else:
+                m = re.search(r'ac_id=(\d+)', body) or re.search(r'index_(\d+)\.html', final_url)
+                self.ac_id = m.group(1) if m else "1"
+        except Exception:
+            self.ac_id = "1"
+        return self.ac_id
+
+    def user_info(self):
+        """查询当前在线状态（rad_user_info）"""
+        return self._jsonp("/cgi-bin/rad_user_info", {})
+
+    def get_challenge(self, username, ip=""):
+        data = self._jsonp("/cgi-bin/get_challenge", {"username": username, "ip": ip})
+        token = data.get("challenge")
+        if not token:
+            raise RuntimeError(f"获取 challenge 失败: {data.get('error_msg') or data.get('error')}")
+        return token, data.get("client_ip") or data.get("online_ip") or ip
+
+    def login(self, username, password):
+        """执行一次登录，返回 (是否成功, 描述信息)"""
+        ac_id = self.detect_ac_id()
+        token, ip = self.get_challenge(username)
+        hmd5 = hmac_md5(password, token)
+        info = encode_info(username, password, ip, ac_id, token)
+        chksum = checksum(token, username, hmd5, ac_id, ip, self.N, self.TYPE, info)
+        data = self._jsonp("/cgi-bin/srun_portal", {
+            "action": "login",
+            "username": username,
+            "password": "{MD5}" + hmd5,
+            "os": "Windows 10",
+            "name": "Windows",
+            "double_stack": "0",
+            "chksum": chksum,
+            "info": info,
+            "ac_id": ac_id,
+            "ip": ip,
+            "n": self.N,
+            "type": self.TYPE,
+        })
+        res = data.get("res") or data.get("error")
+        msg = data.get("error_msg") or data.get("suc_msg") or res
+        if res == "ok" or msg == "ip_already_online_error":
+            return True, msg or "ok"
+        return False, msg or "unknown"
+
+    def logout(self, username, ip=""):
+        """注销当前会话，返回 (是否成功, 描述信息)"""
+        data = self._jsonp("/cgi-bin/srun_portal", {
+            "action": "logout",
+            "username": username,
+            "ac_id": self.detect_ac_id(),
+            "ip": ip,
+        })
+        res = data.get("res") or data.get("error")
+        msg = data.get("error_msg") or data.get("suc_msg") or res
+        return res == "ok" or msg == "not_online_error", msg or "unknown"
+
+def portal_client(config):
+    """按配置构造门户客户端"""
+    return SrunPortalClient(
+        config.get('login_url') or "https://gw.buaa.edu.cn/",
+        timeout=float(config.get('http_login_timeout', 5)),
+        ac_id=config.get('ac_id') or None,
+        source_address=config.get('source_address') or None,
+    )
+
+def http_login(config):
+    """按配置执行 HTTP 登录，成功返回 True"""
+    username = config.get('username', '')
+    password = config.get('password', '')
+    if not username or not password:
+        log("用户名或密码缺失，跳过登录", "WARNING")
+        return False
+    try:
+        client = portal_client(config)
+        host = urlparse(client.base_url).hostname
+        try:
+            get_resolver().resolve(host)
+        except DnsLookupError as e:
+            log(f"{e}，跳过 HTTP 登录", "WARNING")
+            return False
+        log(f"尝试 HTTP 登录: {client.base_url}", "INFO")
+        ok, msg = client.login(username, password)
+        if ok:
+            log(f"HTTP 登录成功: {msg}", "INFO")
+        else:
+            log(f"HTTP 登录失败: {msg}", "WARNING")
+        return ok
+    except Exception as e:
+        log(f"HTTP 登录时发生错误: {e}", "ERROR")
+        return False
+
+def http_logout(config):
+    """按配置执行 HTTP 注销，成功（或本就未在线）返回 True"""
+    username = config.get('username', '')
+    if not username:
+        log("用户名缺失，跳过注销", "WARNING")
+        return False
+    try:
+        ok, msg = portal_client(config).logout(username)
+    except Exception as e:
+        log(f"HTTP 注销时发生错误: {e}", "ERROR")
+        return False
+    log(f"HTTP 注销{'成功' if ok else '失败'}: {msg}", "INFO" if ok else "WARNING")
+    return ok
@@ -0,0 +1,74 @@
+"""托盘模式启动耗时分析
+
+以 `python -X importtime main.py --tray` 的方式在子进程中启动托盘，托盘图标创建后立即退出，
+汇总各模块导入耗时与从启动到托盘图标出现的总时间；可指定预算，超出时返回非零退出码。
+
+退出码：0 正常；1 超出启动预算；2 托盘未就绪或无法测量；3 启动路径上导入了应延迟加载的模块。
+"""
+import os
+import re
+import sys
+import time
+import subprocess
+
+READY_MARKER = "STARTUP_TRAY_READY"
+
+# 这些模块不应出现在托盘启动路径上
+LAZY_MODULES = ("selenium", "latest_chromedriver", "ui")
+
+EXIT_OVER_BUDGET = 1
+EXIT_NOT_READY = 2
+EXIT_EAGER_IMPORT = 3
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(模块名, 自身微秒, 累计微秒, 缩进层级)]"""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+def run_startup_profile(budget=None, top=20):
+    """启动子进程测量，返回进程退出码（0 表示在预算内且没有提前导入延迟加载的模块）"""
+    if getattr(sys, 'frozen', False):
+        print("打包后的程序不支持 -X importtime，请在源码环境中运行")
+        return EXIT_NOT_READY
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    cmd = [sys.executable, "-X", "importtime", main_py, "--tray", "--startup-probe"]
+    start = time.time()
+    proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore")
+    ready = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(READY_MARKER):
+            ready = float(line.split()[1])
+    rows = parse_importtime(proc.stderr)
+
+    print(f"{'模块':40s} {'自身(ms)':>10s} {'累计(ms)':>10s}")
+    top_level = [r for r in rows if r[3] == 0]
+    for name, self_us, cumulative_us, _ in sorted(top_level, key=lambda r: -r[2])[:top]:
+        print(f"{name:40s} {self_us / 1000:10.1f} {cumulative_us / 1000:10.1f}")
+    print(f"导入总耗时: {sum(r[2] for r in top_level) / 1000:.1f} ms（{len(rows)} 个模块）")
+
+    imported = {r[0] for r in rows}
+    eager = [m for m in LAZY_MODULES if m in imported]
+    if eager:
+        print(f"错误: 启动路径上导入了应延迟加载的模块: {', '.join(eager)}")
+
+    if ready is None or proc.returncode != 0:
+        print(f"未检测到托盘图标就绪（退出码 {proc.returncode}）")
+        return EXIT_NOT_READY
+    elapsed = ready - start
+    print(f"启动到托盘图标就绪: {elapsed:.2f} 秒")
+    over_budget = budget is not None and elapsed > budget
+    if over_budget:
+        print(f"超出启动预算 {budget:.2f} 秒")
+    # 提前导入是确定的回归，即使同时超出预算也优先以该退出码报告
+    if eager:
+        return EXIT_EAGER_IMPORT
+    if over_budget:
+        return EXIT_OVER_BUDGET
+    return 0
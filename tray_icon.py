@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 import threading
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction, QMessageBox
 from PyQt5.QtGui import QIcon
@@ -8,11 +9,21 @@ from PyQt5.QtCore import QTimer, QObject, pyqtSignal, pyqtSlot, Qt
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from logger import log
-from config import load_config
-from network_checker import NetworkChecker
+from config import load_config, get_config_store
+from qt_events import EventSignalBridge
+from events import (OutageStarted, FailureClassified, LoginAttempt, LoginSucceeded, LoginFailed,
+                    BreakerUpdated, MonitorStopped)
+from probes import ProbeResult
+from classifier import FAILURE_NAMES
+from breaker import STATE_NAMES
+from platform_utils import process_tree_cpu_supported
+from renewal import SessionStatus, describe_session
 
 tray_manager = None
 
+# Windows 托盘提示最多显示 127 个字符，超出部分被截断
+TOOLTIP_LIMIT = 127
+
 def _resource_path(name: str) -> str:
     base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base, name)
@@ -43,18 +54,31 @@ class UIStarter(QObject):
 
 class TrayIconManager(QObject):
     exit_app_signal = pyqtSignal()
+    config_changed_signal = pyqtSignal(object, object)
 
     def __init__(self):
         super().__init__()
         self.tray_icon: QSystemTrayIcon = None
         self.status_action: QAction = None
+        self.detail_actions = {}
         self.monitor_action: QAction = None
         self.is_monitoring = False
         self.network_checker = None
         self.check_thread: threading.Thread = None
         self.ui_starter = UIStarter()
         self.config = load_config()
+        self.status = "已停止"
+        self.live_state = ""
+        self.breaker_short = ""
         self.setup_tray_icon()
+        # 监控线程发布的事件经排队信号在主线程中更新托盘状态
+        self.event_bridge = EventSignalBridge(parent=self)
+        self.event_bridge.event_received.connect(self.on_monitor_event, type=Qt.QueuedConnection)
+        # 配置存储的变更（GUI 保存或外部编辑）可能来自其它线程，同样排队到主线程处理
+        self.config_changed_signal.connect(self.reload_config, type=Qt.QueuedConnection)
+        store = get_config_store()
+        store.subscribe(self.config_changed_signal.emit)
+        store.start_watcher()
 
     def setup_tray_icon(self):
         try:
@@ -78,6 +102,13 @@ class TrayIconManager(QObject):
         status_action.setEnabled(False)
         menu.addAction(status_action)
         self.status_action = status_action
+        # 熔断器、登录消耗与门户会话的详细信息放在菜单中，托盘提示只保留概要
+        for key in ("breaker", "cost", "session"):
+            action = QAction("", menu)
+            action.setEnabled(False)
+            action.setVisible(False)
+            menu.addAction(action)
+            self.detail_actions[key] = action
         menu.addSeparator()
         show_gui_action = QAction("打开主界面", menu)
         show_gui_action.triggered.connect(self.show_gui)
@@ -127,6 +158,7 @@ class TrayIconManager(QObject):
                 self.config['chromedriver_path'] = dpath
                 config_update_flag = True
             if not chromedriver_version:
+                import latest_chromedriver
                 self.config['chromedriver_version'] = latest_chromedriver.download_driver.get_version(self.config['chromedriver_path'])
                 if self.config['chromedriver_version'] is None:
                     latest_chromedriver.safely_set_chromedriver_path()
@@ -134,7 +166,7 @@ class TrayIconManager(QObject):
                 config_update_flag = True
             if config_update_flag:
                 from config import save_config
-                save_config(self.config)
+                save_config({k: self.config[k] for k in ('chrome_version', 'chromedriver_path', 'chromedriver_version')})
             return True, ""
         except Exception as e:
             return False, f"检查配置失败: {e}"
@@ -148,6 +180,7 @@ class TrayIconManager(QObject):
             self.show_notification("无法启动监控", msg, 4000)
             return
         try:
+            from network_checker import NetworkChecker
             self.network_checker = NetworkChecker(self.config)
             self.is_monitoring = True
             self.check_thread = threading.Thread(target=self.network_checker.start_checking, daemon=True)
@@ -176,23 +209,83 @@ class TrayIconManager(QObject):
             log(f"停止监控失败: {e}", "ERROR")
 
     def update_status(self, status):
+        self.status = status
         if self.status_action:
             self.status_action.setText(f"状态: {status}")
+        self.refresh_tooltip()
+
+    def set_detail(self, key, text):
+        """更新菜单中的详细信息行，text 为空时隐藏"""
+        action = self.detail_actions.get(key)
+        if action:
+            action.setText(text)
+            action.setVisible(bool(text) and self.is_monitoring)
+
+    def refresh_tooltip(self):
+        """托盘提示保持两行：运行状态，以及在线/登录概要（熔断时先显示下次允许登录的时间）"""
         if self.tray_icon:
-            self.tray_icon.setToolTip(f"网络自动检查与登录系统 ({status})")
+            tip = f"网络自动检查与登录系统 ({self.status})"
+            if self.is_monitoring:
+                line = "，".join(s for s in (self.breaker_short, self.live_state) if s)
+                if line:
+                    tip += f"\n{line}"
+            if len(tip) > TOOLTIP_LIMIT:
+                tip = tip[:TOOLTIP_LIMIT - 1] + "…"
+            self.tray_icon.setToolTip(tip)
+        for action in self.detail_actions.values():
+            action.setVisible(bool(action.text()) and self.is_monitoring)
+
+    @pyqtSlot(object)
+    def on_monitor_event(self, event):
+        now = time.strftime('%H:%M:%S', time.localtime(getattr(event, "at", None)))
+        if isinstance(event, ProbeResult):
+            if event.ok:
+                self.live_state = f"在线 {event.rtt:.0f} ms（{now} 检查）"
+            elif not self.live_state.startswith("离线"):
+                self.live_state = f"离线（{now} 起）"
+        elif isinstance(event, OutageStarted):
+            self.live_state = f"离线（{now} 起）"
+        elif isinstance(event, FailureClassified):
+            self.live_state = f"离线（{now}）: {FAILURE_NAMES.get(event.kind, event.kind)}"
+        elif isinstance(event, LoginAttempt):
+            if event.attempt is None:
+                self.live_state = f"正在续期会话（{event.engine}）"
+            else:
+                self.live_state = f"正在登录（第 {event.attempt} 次，{event.engine}）"
+        elif isinstance(event, LoginSucceeded):
+            self.live_state = f"登录成功，用时 {event.duration:.1f} 秒（{now}）"
+        elif isinstance(event, LoginFailed):
+            detail = event.detail if len(event.detail) <= 40 else event.detail[:39] + "…"
+            self.live_state = f"登录失败（{now}）: {detail}"
+        elif isinstance(event, BreakerUpdated):
+            state = f"登录熔断器: {STATE_NAMES.get(event.state, event.state)}"
+            self.breaker_short = ""
+            if event.next_attempt_at:
+                next_at = time.strftime('%H:%M:%S', time.localtime(event.next_attempt_at))
+                state += f"，下次允许登录 {next_at}"
+                self.breaker_short = f"{next_at} 前暂停登录"
+            self.set_detail("breaker", state)
+            scope = "登录线程与浏览器" if process_tree_cpu_supported() else "仅登录线程"
+            self.set_detail("cost", f"累计登录 {event.logins} 次，CPU（{scope}）{event.cpu_seconds:.1f} 秒，"
+                                    f"耗时 {event.wall_seconds:.1f} 秒")
+        elif isinstance(event, SessionStatus):
+            self.set_detail("session", f"门户会话: {describe_session(event)}（{now} 查询）")
+        elif isinstance(event, MonitorStopped):
+            self.live_state = ""
+            self.breaker_short = ""
+        self.refresh_tooltip()
     
-    def reload_config(self, new_config=None):
-        """从外部（GUI）热更新配置"""
+    def reload_config(self, new_config=None, changed=None):
+        """配置存储变更时热更新（GUI 保存或外部编辑配置文件）"""
         try:
             if new_config is None:
-                from config import load_config
-                self.config = load_config()
-            else:
-                self.config = dict(new_config)
+                new_config = load_config()
+            self.config = dict(new_config)
             if self.network_checker:
-                # 直接替换配置对象，下一轮循环生效
-                self.network_checker.config = self.config
-            log("配置已热更新", "INFO")
+                # 替换配置会唤醒监控循环，check_interval 等立即生效
+                self.network_checker.config = dict(self.config)
+            keys = f": {', '.join(sorted(changed))}" if changed else ""
+            log(f"配置已热更新{keys}", "INFO")
             self.show_notification("配置更新", "新配置已应用", 2500)
         except Exception as e:
             log(f"配置热更新失败: {e}", "ERROR")
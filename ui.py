@@ -1,13 +1,12 @@
 import sys
 import os
-import re
+import time
 import logging
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QSpinBox, 
-                             QCheckBox, QPushButton, QTextEdit, QGroupBox,
+                             QCheckBox, QPushButton, QListView, QGroupBox,
                              QMessageBox, QTabWidget, QFileDialog)
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal, QObject
-from PyQt5.QtGui import QTextCursor
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QObject
 
 # 添加当前目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -16,6 +15,10 @@ from config import load_config, save_config
 from network_checker import NetworkChecker
 from logger import setup_logger, log, set_ui_handler
 from auto_start import setup_autostart, check_autostart_status
+from log_view import LogFileModel, LogBatcher, load_older_in_view
+from qt_events import EventSignalBridge
+from events import OutageStarted, LoginAttempt, LoginSucceeded, LoginFailed
+from probes import ProbeResult
 
 class UIHandler(QObject, logging.Handler):
     """自定义日志处理器，用于将日志发送到UI"""
@@ -74,9 +77,9 @@ class MainWindow(QMainWindow):
         self.load_config_values()
         self.setup_ui_logging()
         self.sync_monitoring_status()
-        self.status_sync_timer = QTimer(self)
-        self.status_sync_timer.timeout.connect(self.sync_monitoring_status)
-        self.status_sync_timer.start(1000)  # 每1秒同步一次
+        # 由监控事件驱动状态刷新，不再定时轮询托盘状态
+        self.event_bridge = EventSignalBridge(parent=self)
+        self.event_bridge.event_received.connect(self.on_monitor_event, type=Qt.QueuedConnection)
         
     def init_ui(self):
         """初始化用户界面"""
@@ -135,6 +138,7 @@ class MainWindow(QMainWindow):
         url_layout = QHBoxLayout()
         url_layout.addWidget(QLabel("测试网址:"))
         self.test_url_input = QLineEdit()
+        self.test_url_input.setPlaceholderText("多个目标用逗号分隔")
         url_layout.addWidget(self.test_url_input)
         login_layout.addLayout(url_layout)
         
@@ -147,6 +151,9 @@ class MainWindow(QMainWindow):
         # 开机自启动
         self.autostart_checkbox = QCheckBox("开机自动启动")
         system_layout.addWidget(self.autostart_checkbox)
+
+        self.driver_status_label = QLabel("Chrome/ChromeDriver: 未检查")
+        system_layout.addWidget(self.driver_status_label)
         
         config_layout.addWidget(system_group)
         
@@ -168,6 +175,29 @@ class MainWindow(QMainWindow):
         
         config_layout.addLayout(button_layout)
         
+        # 历史统计标签页
+        history_tab = QWidget()
+        history_layout = QVBoxLayout(history_tab)
+        tabs.addTab(history_tab, "历史统计")
+        self.history_labels = {}
+        for key, title in (("availability_day", "最近 24 小时可用率"),
+                           ("availability_week", "最近 7 天可用率"),
+                           ("outages_week", "最近 7 天断网"),
+                           ("logins_month", "本月登录"),
+                           ("login_median_month", "本月登录耗时中位数")):
+            row = QHBoxLayout()
+            row.addWidget(QLabel(f"{title}:"))
+            label = QLabel("-")
+            row.addWidget(label)
+            row.addStretch()
+            history_layout.addLayout(row)
+            self.history_labels[key] = label
+        refresh_history_btn = QPushButton("刷新")
+        refresh_history_btn.clicked.connect(self.refresh_history)
+        history_layout.addWidget(refresh_history_btn)
+        history_layout.addStretch()
+        tabs.currentChanged.connect(lambda index: tabs.widget(index) is history_tab and self.refresh_history())
+
         # 日志标签页
         log_tab = QWidget()
         log_layout = QVBoxLayout(log_tab)
@@ -187,8 +217,19 @@ class MainWindow(QMainWindow):
         log_control_layout.addStretch()
         log_layout.addLayout(log_control_layout)
         
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
+        # 列表视图只渲染可见行，历史日志由模型按页加载
+        self.log_model = LogFileModel(self._log_file_path(),
+                                      max_rows=int(self.config.get('log_max_lines', 5000) or 0), parent=self)
+        # 日志先缓冲，定时批量写入模型，避免每条记录都触发一次布局与滚动
+        self.log_batcher = LogBatcher(self.log_model, int(self.config.get('log_flush_interval', 100)), self)
+        self.log_batcher.flushed.connect(self._on_logs_flushed)
+        self._log_at_bottom = True
+        self.log_display = QListView()
+        self.log_display.setModel(self.log_model)
+        self.log_display.setUniformItemSizes(True)
+        self.log_display.setSelectionMode(QListView.ExtendedSelection)
+        self.log_display.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.log_display.verticalScrollBar().valueChanged.connect(self._on_log_scrolled)
         log_layout.addWidget(self.log_display)
         
         # 状态栏
@@ -213,33 +254,35 @@ class MainWindow(QMainWindow):
         self.password_input.setText(self.config.get('password', ''))
         self.login_url_input.setText(self.config.get('login_url', 'https://gw.buaa.edu.cn/'))
         self.interval_input.setValue(self.config.get('check_interval', 300))
-        self.test_url_input.setText(self.config.get('test_url', 'https://kimi.moonshot.cn'))
+        test_url = self.config.get('test_url', 'https://kimi.moonshot.cn')
+        if isinstance(test_url, list):
+            test_url = ", ".join(test_url)
+        self.test_url_input.setText(test_url)
 
         # 检查自启动状态
         self.autostart_checkbox.setChecked(check_autostart_status())
     
     def save_config(self, is_start_monitoring=False):
-        """保存配置"""
-        self.config['username'] = self.username_input.text()
-        self.config['password'] = self.password_input.text()
-        self.config['login_url'] = self.login_url_input.text()
-        self.config['check_interval'] = self.interval_input.value()
-        self.config['test_url'] = self.test_url_input.text()
-
-
-        save_config(self.config)
+        """保存配置，配置无效时提示并返回 False"""
+        # 只提交界面上的字段，避免用旧副本覆盖配置文件中在外部修改过的其它项；
+        # 正在运行的托盘监控通过配置存储的订阅自动获得新配置
+        try:
+            save_config({
+                'username': self.username_input.text(),
+                'password': self.password_input.text(),
+                'login_url': self.login_url_input.text(),
+                'check_interval': self.interval_input.value(),
+                'test_url': self.test_url_input.text(),
+            })
+        except ValueError as e:
+            log(f"配置无效，未保存: {e}", "WARNING")
+            QMessageBox.warning(self, "配置无效", str(e))
+            return False
+        self.config = load_config()
 
         # 设置开机自启动
         success, message = setup_autostart(self.autostart_checkbox.isChecked())
 
-        # 将新配置应用到正在运行的托盘监控
-        try:
-            from tray_icon import tray_manager
-            if tray_manager:
-                tray_manager.reload_config(self.config)
-        except Exception:
-            pass
-
         if success:
             log(f"保存配置并设置自启动成功: {message}", "INFO")
             if is_start_monitoring == False:
@@ -247,6 +290,7 @@ class MainWindow(QMainWindow):
         else:
             log(f"保存配置完成，但自启动设置失败: {message}", "WARNING")
             QMessageBox.warning(self, "提示", f"配置已保存，但自启动设置失败：{message}")
+        return True
     
     def _validate_required_before_start(self):
         """校验启动必需项：用户名、密码、chromedriver_path"""
@@ -282,7 +326,8 @@ class MainWindow(QMainWindow):
             return
 
         # 启动前保存配置，确保托盘读取到最新配置
-        self.save_config(is_start_monitoring = True)
+        if not self.save_config(is_start_monitoring = True):
+            return
         
         from tray_icon import tray_manager
         if tray_manager:
@@ -310,54 +355,32 @@ class MainWindow(QMainWindow):
         self.load_history_logs()
         log("GUI界面初始化完成", "INFO")
     
+    def _log_file_path(self):
+        return self.config['log_file_path'] if 'log_file_path' in self.config else f'network_checker.log'
+
     def load_history_logs(self):
-        log_file = self.config['log_file_path'] if 'log_file_path' in self.config else f'network_checker.log'
-        if os.path.exists(log_file):
-            color_map = {
-                "ERROR": "red",
-                "WARNING": "orange", 
-                "INFO": "black",
-                "DEBUG": "gray",
-                "CRITICAL": "darkred"
-            }
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    level = re.search(r'\] (\w+):', line)
-                    if level:
-                        level_name = level.group(1)
-                        color = color_map.get(level_name, "black")
-                    else:
-                        color = "black"
-                    html_message = f'<font color="{color}">{line.strip()}</font>'
-                    self.log_display.append(html_message)
+        """只加载日志尾部，更早的记录在滚动到顶部时按页加载"""
+        self.log_model.path = self._log_file_path()
+        self.log_model.load()
+        self.log_display.scrollToBottom()
+
+    def _on_log_scrolled(self, value):
+        scrollbar = self.log_display.verticalScrollBar()
+        self._log_at_bottom = value == scrollbar.maximum()
+        if value != scrollbar.minimum() or not self.log_model.can_load_older():
+            return
+        # 保持当前可见内容不跳动
+        load_older_in_view(self.log_display, self.log_model)
 
     def append_log(self, message, level):
-        """追加日志到显示框"""
+        """追加日志到显示框（缓冲后批量刷新）"""
+        self.log_batcher.add(message, level)
+
+    def _on_logs_flushed(self, count):
         try:
-            color_map = {
-                "ERROR": "red",
-                "WARNING": "orange", 
-                "INFO": "black",
-                "DEBUG": "gray",
-                "CRITICAL": "darkred"
-            }
-            
-            color = color_map.get(level, "black")
-            
-            # 使用HTML格式显示带颜色的日志
-            html_message = f'<font color="{color}">{message}</font>'
-            
-            # 保存当前滚动位置
-            scrollbar = self.log_display.verticalScrollBar()
-            at_bottom = scrollbar.value() == scrollbar.maximum()
-            
-            # 追加日志
-            self.log_display.append(html_message)
-            
-            # 如果之前就在底部或者启用了自动滚动，则滚动到底部
-            if self.auto_scroll and at_bottom:
-                self.log_display.moveCursor(QTextCursor.End)
-                
+            # 如果之前就在底部且启用了自动滚动，则滚动到底部
+            if self.auto_scroll and self._log_at_bottom:
+                self.log_display.scrollToBottom()
         except Exception as e:
             print(f"日志显示错误: {e}")
     
@@ -369,8 +392,9 @@ class MainWindow(QMainWindow):
         if reply != QMessageBox.Yes:
             return
 
-        self.log_display.clear()
-        log_file = self.config['log_file_path'] if 'log_file_path' in self.config else f'network_checker.log'
+        self.log_batcher.clear()
+        self.log_model.clear()
+        log_file = self._log_file_path()
         try:
             if os.path.exists(log_file):
                 open(log_file, 'w', encoding='utf-8').close()
@@ -413,18 +437,76 @@ class MainWindow(QMainWindow):
         event.ignore()
         self.hide()
         log("GUI隐藏到托盘", "INFO")
-    def sync_monitoring_status(self):
+    def update_driver_status(self):
+        """显示缓存的 Chrome/ChromeDriver 版本匹配结果"""
+        from chromedriver_manager import get_match_status
+        status = get_match_status()
+        if not status:
+            text = "Chrome/ChromeDriver: 未检查"
+        else:
+            state = {True: "已匹配", False: "不匹配"}.get(status["matched"], "未知")
+            text = (f"Chrome/ChromeDriver: {state} "
+                    f"({status['chrome_version'] or '-'} / {status['chromedriver_version'] or '-'})")
+        self.driver_status_label.setText(text)
+
+    def sync_monitoring_status(self, detail=""):
         """同步托盘监控状态到GUI"""
+        self.update_driver_status()
         from tray_icon import tray_manager
         if tray_manager and tray_manager.is_monitoring:
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
-            self.statusBar().showMessage("监控运行中...")
+            self.statusBar().showMessage(f"监控运行中... {detail}".strip())
         else:
             self.start_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
             self.statusBar().showMessage("监控已停止")
 
+    def refresh_history(self):
+        """从历史数据库查询统计数据（均为按时间索引的查询）"""
+        try:
+            from history import get_history
+            store = get_history()
+            now = time.time()
+            month_start = time.mktime(time.localtime(now)[:2] + (1, 0, 0, 0, 0, 0, -1))
+
+            def percent(value):
+                return "-" if value is None else f"{value * 100:.2f}%"
+
+            self.history_labels["availability_day"].setText(percent(store.availability(now - 86400)))
+            self.history_labels["availability_week"].setText(percent(store.availability(now - 7 * 86400)))
+            count, seconds = store.outage_summary(now - 7 * 86400)
+            self.history_labels["outages_week"].setText(f"{count} 次，共 {seconds / 60:.1f} 分钟")
+            logins = store.login_summary(month_start)
+            self.history_labels["logins_month"].setText(f"{logins['attempts']} 次，成功 {logins['succeeded']} 次")
+            median = logins["median_duration"]
+            to_online = logins["median_time_to_online"]
+            text = "-" if median is None else f"{median:.2f} 秒"
+            if to_online is not None:
+                text += f"（恢复在线 {to_online:.2f} 秒）"
+            self.history_labels["login_median_month"].setText(text)
+        except Exception as e:
+            log(f"读取历史统计失败: {e}", "WARNING")
+
+    def on_monitor_event(self, event):
+        """在主线程中处理监控线程发布的事件"""
+        if isinstance(event, ProbeResult):
+            detail = f"在线 {event.rtt:.0f} ms" if event.ok else f"离线: {event.error}"
+        elif isinstance(event, OutageStarted):
+            detail = "检测到断网"
+        elif isinstance(event, LoginAttempt):
+            detail = "正在续期会话" if event.attempt is None else f"正在登录（第 {event.attempt} 次）"
+        elif isinstance(event, LoginSucceeded):
+            detail = f"登录成功，用时 {event.duration:.1f} 秒"
+        elif isinstance(event, LoginFailed):
+            detail = "登录失败"
+        else:
+            detail = ""
+        self.sync_monitoring_status(detail)
+        if isinstance(event, (OutageStarted, LoginSucceeded, LoginFailed)) and self.isVisible():
+            # 等写线程落盘后再刷新
+            QTimer.singleShot(3000, self.refresh_history)
+
 def start_ui():
     """启动UI界面 - 独立运行"""
     app = QApplication.instance()